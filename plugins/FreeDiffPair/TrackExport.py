@@ -1,10 +1,12 @@
 import math
+from array import array
 from .include import G_PLUGIN_LOG_FILE
 from .logger import getLogger
 from .mathLib import Vec2D
-from .kiLib import PY_PCB_TRACK
+from .kiLib import PY_PCB_TRACK, TrackTable
+from .span import Spanned
 
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Set, Tuple
 
 logger = getLogger("track-export")
 logger.addFileHandler(G_PLUGIN_LOG_FILE)
@@ -14,6 +16,9 @@ class TPoint2i:
     TRACK_END_POINT = 1
     TRACK_START_POINT = -1
 
+    # Bumped whenever any endpoint moves, Polyline2D rebuilds its coordinate arrays on a change
+    _generation: int = 0
+
     class bindInfo:
         def __init__(self, pyTrack: PY_PCB_TRACK, ptype: int):
             self.obj: PY_PCB_TRACK = pyTrack
@@ -31,18 +36,19 @@ class TPoint2i:
     def SetXY(self,x:int|float,y:int|float):
         self._x = int(x)
         self._y = int(y)
+        TPoint2i._generation += 1
 
     @property
     def x(self): return self._x
 
     @x.setter
-    def x(self,x:int|float): self._x = int(x)
+    def x(self,x:int|float): self.SetXY(x, self._y)
 
     @property
     def y(self): return self._y
 
     @y.setter
-    def y(self,y:int|float): self._y = int(y)
+    def y(self,y:int|float): self.SetXY(self._x, y)
 
     # fmt:on
 
@@ -74,13 +80,15 @@ class TPoint2i:
     def GetBindFirst(self):
         return self._bindList[0]
 
-    # Update all bound line objects
-    def Update(self):
-        if len(self._bindList) == 0:
+    # Update all bound line objects, or only the given binds of this endpoint
+    def Update(self, bindList: "List[TPoint2i.bindInfo] | None" = None):
+        if bindList is None:
+            bindList = self._bindList
+        if len(bindList) == 0:
             logger.error(f"{self} endpoint does not bind any line segments and will not perform any operation")
             return
 
-        for track in self._bindList:
+        for track in bindList:
             tobj = track.obj
             ptype = track.ptype
             # Endpoint type endpoint
@@ -106,13 +114,62 @@ class TPoint2i:
         return self.x == x and self.y == y
 
 
+class TPoint2iIndex:
+    """Endpoint index keyed on the integer (x, y) coordinate, keeps insertion order."""
+
+    def __init__(self) -> None:
+        self._ptDict: Dict[Tuple[int, int], TPoint2i] = {}
+
+    def Get(self, x: int | float, y: int | float):
+        return self._ptDict.get((int(x), int(y)))
+
+    def Bind(self, x: int | float, y: int | float, ptInfo: TPoint2i.bindInfo) -> Tuple[TPoint2i, bool]:
+        key = (int(x), int(y))
+        point = self._ptDict.get(key)
+        # The endpoint exists and the bound line
+        if point is not None:
+            point.AppendBind(ptInfo)
+            return point, False
+        # Add to cache binding line
+        point = TPoint2i(key[0], key[1], ptInfo)
+        self._ptDict[key] = point
+        return point, True
+
+    def GetList(self):
+        return list(self._ptDict.values())
+
+    def Count(self):
+        return len(self._ptDict)
+
+    def __iter__(self):
+        return iter(self._ptDict.values())
+
+    def __len__(self):
+        return len(self._ptDict)
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__} 0x{id(self):X} point:{self.Count()}>"
+
+
 class Polyline2D:
-    def __init__(self, start: TPoint2i) -> None:
+    def __init__(self, start: TPoint2i, xyStore: bool = False) -> None:
         self._i: int = 1
         self._ptList: List[TPoint2i] = [start]
+        # Identity index of the points in the list
+        self._ptSet: Set[int] = {id(start)}
+        # Optional parallel int64 coordinate arrays
+        self._xArray: array | None = None
+        self._yArray: array | None = None
+        # TPoint2i._generation the arrays were built at
+        self._xyGeneration: int = -1
+        if xyStore:
+            self.SyncXY()
 
     def Reverse(self):
         self._ptList.reverse()
+        if self._xArray is not None and self._yArray is not None:
+            self._xArray.reverse()
+            self._yArray.reverse()
 
     def GetList(self):
         return self._ptList
@@ -126,18 +183,45 @@ class Polyline2D:
     def GetEnd(self):
         return self._ptList[-1]
 
+    def HasPoint(self, pt: TPoint2i):
+        return id(pt) in self._ptSet
+
     def AddPoint(self, pt: TPoint2i):
-        if pt in self._ptList:
+        if id(pt) in self._ptSet:
             return False
         self._ptList.append(pt)
+        self._ptSet.add(id(pt))
+        if self._xArray is not None and self._yArray is not None:
+            self._xArray.append(pt._x)
+            self._yArray.append(pt._y)
         return True
 
     def RemovePoint(self, pt):
-        if pt not in self._ptList:
+        if id(pt) not in self._ptSet:
             return False
-        self._ptList.remove(pt)
+        i = next(i for i, p in enumerate(self._ptList) if p is pt)
+        del self._ptList[i]
+        self._ptSet.discard(id(pt))
+        if self._xArray is not None and self._yArray is not None:
+            del self._xArray[i]
+            del self._yArray[i]
         return True
 
+    # The coordinate arrays follow AddPoint/RemovePoint/Reverse,
+    # GetXY rebuilds them once any point has been moved since
+    def SyncXY(self):
+        self._xArray = array("q", (pt._x for pt in self._ptList))
+        self._yArray = array("q", (pt._y for pt in self._ptList))
+        self._xyGeneration = TPoint2i._generation
+
+    def HasXY(self):
+        return self._xArray is not None
+
+    def GetXY(self) -> Tuple[array, array]:
+        if self._xArray is None or self._yArray is None or self._xyGeneration != TPoint2i._generation:
+            self.SyncXY()
+        return self._xArray, self._yArray  # type: ignore
+
     def _GetLine(self, i: int):
         return self._ptList[i - 1], self._ptList[i]
 
@@ -207,23 +291,23 @@ class ExportInfo_Result:
         self.width: int = width
 
 
-def ExportInfo(pyTrackList: List[PY_PCB_TRACK]):
+@Spanned()
+def ExportInfo(pyTrackList: TrackTable | List[PY_PCB_TRACK]):
     #
+    table = TrackTable.From(pyTrackList)
     logger.info("")
     logger.info(f"{ExportInfo.__name__}():")
 
     logger.info("Get line physical information:")
-    layer = pyTrackList[0].GetLayer()
-    width = pyTrackList[0].GetWidth()
-    for track in pyTrackList[1:]:
-        ret_layer = track.GetLayer()
-        ret_width = track.GetWidth()
-        if layer != ret_layer:
-            assert "failure (different lines)"
-        if width != ret_width:
-            assert "Failed (line width is inconsistent)"
-
-    logger.info(f"  copper layer {pyTrackList[0].GetLayerName()}({layer})")
+    layer = table.layer[0]
+    width = table.width[0]
+    for i in range(1, table.Count()):
+        ret_layer = table.layer[i]
+        ret_width = table.width[i]
+        assert layer == ret_layer, "failure (different lines)"
+        assert width == ret_width, "Failed (line width is inconsistent)"
+
+    logger.info(f"  copper layer {table.tracks[0].GetLayerName()}({layer})")
     logger.info(f"  width {width}(unit)")
     return ExportInfo_Result(layer, width)
 
@@ -240,45 +324,65 @@ class ExportPoint_Result:
         self.shareEp2x: Tuple[TPoint2i, TPoint2i] = share_ep_2pt
 
 
-def ExportPoint(pyTrackList: List[PY_PCB_TRACK]):
+def GroupDanglingByTrack(ptList: List[TPoint2i]):
+    # Both ends of the same line object, in the order the first end appears in the point list
+    group: Dict[PY_PCB_TRACK, List[TPoint2i]] = {}
+    for pt in ptList:
+        group.setdefault(pt.GetBindFirst().obj, []).append(pt)
+
+    diff_list: List[Tuple[TPoint2i, TPoint2i]] = []
+    paired: Set[int] = set()
+    for pts in group.values():
+        if len(pts) != 2:
+            continue
+        # The endpoint attribute cannot be the same (the design should not be the same)
+        if pts[0].GetBindFirst().ptype == pts[1].GetBindFirst().ptype:
+            continue
+        diff_list.append((pts[0], pts[1]))
+        paired.update((id(pts[0]), id(pts[1])))
+
+    # Remaining dangling endpoints keep their input order
+    rest_list = [pt for pt in ptList if id(pt) not in paired]
+    return diff_list, rest_list
+
+
+@Spanned()
+def ExportPoint(pyTrackList: TrackTable | List[PY_PCB_TRACK]):
     #
-    all_point_list: List[TPoint2i] = []
+    table = TrackTable.From(pyTrackList)
+    all_point_index = TPoint2iIndex()
     logger.info("")
     logger.info(f"{ExportPoint.__name__}():")
+    trace = logger.trace
 
-    def AddPoint(x, y, ptInfo: TPoint2i.bindInfo, ptList: List[TPoint2i]):
-        for point in ptList:
-            # The endpoint exists and the bound line
-            if point.XYEQ(x, y):
-                point.AppendBind(ptInfo)
-                logger.info(f"  bind to   {point}")
-                return
-            continue
-        # Add to cache binding line
-        obj = TPoint2i(x, y, ptInfo)
-        ptList.append(obj)
-        logger.info(f"  new endpoint {obj}")
+    def AddPoint(x, y, ptInfo: TPoint2i.bindInfo, ptIndex: TPoint2iIndex):
+        point, created = ptIndex.Bind(x, y, ptInfo)
+        if not trace:
+            return
+        if created:
+            logger.info(f"  new endpoint {point}")
+        else:
+            logger.info(f"  bind to   {point}")
 
     # When the endpoint of all line sections is the same point,
     # it is bound to the corresponding object
-    logger.info(f"Input line endpoint check(x{len(pyTrackList)}):")
-    for track in pyTrackList:
-        logger.info(f"  {track}")
+    logger.info(f"Input line endpoint check(x{table.Count()}):")
+    for i, track in enumerate(table.tracks):
+        if trace:
+            logger.info(f"  {track}")
         # From the starting point of the line
-        ptStart = track.GetStart()
         AddPoint(
-            ptStart.x,
-            ptStart.y,
+            table.sx[i],
+            table.sy[i],
             TPoint2i.bindInfo(track, TPoint2i.TRACK_START_POINT),
-            all_point_list,
+            all_point_index,
         )
         # Import the end point of the route
-        ptEnd = track.GetEnd()
         AddPoint(
-            ptEnd.x,
-            ptEnd.y,
+            table.ex[i],
+            table.ey[i],
             TPoint2i.bindInfo(track, TPoint2i.TRACK_END_POINT),
-            all_point_list,
+            all_point_index,
         )
 
     logger.info("Endpoint capture list:")
@@ -286,8 +390,9 @@ def ExportPoint(pyTrackList: List[PY_PCB_TRACK]):
     share_point_list: List[TPoint2i] = []
 
     # Export polyline endpoint list independent line list
-    for point in all_point_list:
-        logger.info(f"  {point}")
+    for point in all_point_index:
+        if trace:
+            logger.info(f"  {point}")
         count = point.BindCount()
         assert count <= 2, "Endpoint is shared by more than two lines."
         if count == 1:
@@ -304,66 +409,28 @@ def ExportPoint(pyTrackList: List[PY_PCB_TRACK]):
     assert len(share_point_list) != 0, "Failed (no continuous polyline)"
     assert len(indep_point_list) == 4 or len(indep_point_list) == 6, "Failure (less than four or six suspended endpoints)"
 
-    track_diff_list: List[Tuple[TPoint2i, TPoint2i]] = []
-
-    def FindALine(ptList: List[TPoint2i]):
-        ret: Tuple[TPoint2i, TPoint2i] | None = None
-        # Find the two ends on the same line in the point list
-        for pt1 in ptList:
-            for pt2 in ptList:
-                # Jump over yourself
-                if pt1 is pt2:
-                    continue
-                # The endpoint is not in the same line, and the differential line is not hit
-                if pt1.GetBindFirst().obj is not pt2.GetBindFirst().obj:
-                    continue
-                # The endpoint attribute cannot be the same (the design should not be the same)
-                if pt1.GetBindFirst().ptype == pt2.GetBindFirst().ptype:
-                    continue
-                # Only record the first line segment found and remove both ends from the input list
-                ret = (pt1, pt2)
-                ptList.remove(pt1)
-                ptList.remove(pt2)
-                # Return immediately
-                return ret
-            continue
-        # No line segments found
-        return None
-
-    line_count = len(pyTrackList)
-
-    # Export the first differential reference line
-    track1d_2pt = FindALine(indep_point_list)
-    assert track1d_2pt is not None, "Failed (reference differential line not found)"
-
-    # Insert the first reference line list
-    line_count -= 1
-    track_diff_list.append(track1d_2pt)
-    logger.info("Output reference differential line A:")
-    logger.info(f"  {track1d_2pt[0].GetBindFirst().obj}")
-    for point in track1d_2pt:
-        logger.info(f"  {point}")
-
-    # Export the second differential reference line
-    track2d_2pt = FindALine(indep_point_list)
-    if track2d_2pt is not None:
-        line_count -= 1
-        # Insert second reference line list
-        track_diff_list.append(track2d_2pt)
-        logger.info("Output Reference Differential Line B:")
-        logger.info(f"  {track2d_2pt[0].GetBindFirst().obj}")
-        for point in track2d_2pt:
-            logger.info(f"  {point}")
+    # Group the dangling endpoints by owning line in one pass,
+    # a line with both ends dangling is a reference differential line
+    track_diff_list, indep_point_list = GroupDanglingByTrack(indep_point_list)
+    assert len(track_diff_list) != 0, "Failed (reference differential line not found)"
 
     # In design, only up to two independent line segments are allowed
     # (head differential line + tail differential line)
-    assert FindALine(indep_point_list) is None, "failure (existing excess independent line segment)"
+    assert len(track_diff_list) <= 2, "failure (existing excess independent line segment)"
+
+    line_count = table.Count() - len(track_diff_list)
+    for name, track_2pt in zip(("A", "B"), track_diff_list):
+        logger.info(f"Output reference differential line {name}:")
+        logger.info(f"  {track_2pt[0].GetBindFirst().obj}")
+        for point in track_2pt:
+            logger.info(f"  {point}")
 
     # Verify the number of polyline endpoints (total input number -
     # reference number of differential lines)
     logger.info(f"Output reference single-ended shared endpoint (x{len(share_point_list)}):")
     for point in share_point_list:
-        logger.info(f"  {point}")
+        if trace:
+            logger.info(f"  {point}")
 
     # If there are N polylines in the design, there will be N-1 endpoints.
     assert line_count - 1 == len(share_point_list), "Failed (wrong number of shared endpoints)"
@@ -395,6 +462,47 @@ class ExportLine_Result:
         self.dReferEnd: Tuple[TPoint2i, TPoint2i] | None = dReferEnd
 
 
+def BuildTrackAdjacency(ptList: Iterable[TPoint2i]) -> Dict[PY_PCB_TRACK, Dict[int, TPoint2i]]:
+    # track -> {endpoint type: endpoint}, every bound line object knows both of its ends
+    adjacency: Dict[PY_PCB_TRACK, Dict[int, TPoint2i]] = {}
+    for pt in ptList:
+        for bind in pt.GetBindList():
+            adjacency.setdefault(bind.obj, {})[bind.ptype] = pt
+    return adjacency
+
+
+def ExportLineChain(ptStart: TPoint2i, adjacency: Dict[PY_PCB_TRACK, Dict[int, TPoint2i]]) -> List[TPoint2i]:
+    # Ordered vertex chain of the polyline beginning at a dangling endpoint,
+    # each step jumps to the opposite endpoint of the line object not used last time
+    chain: List[TPoint2i] = [ptStart]
+    black_obj: PY_PCB_TRACK | None = None
+    loop_break = len(adjacency) + 2
+    while True:
+        # Cycle protection
+        loop_break -= 1
+        assert loop_break > 0, "Circulation protection (the maximum number of cycles exceeds the maximum cycle when building a folding line)"
+
+        cur_bind: TPoint2i.bindInfo | None = None
+        for bind in chain[-1].GetBindList():
+            if bind.obj is black_obj:
+                continue
+            cur_bind = bind
+
+        # Only the dangling end point remains after blocking the last used object
+        if cur_bind is None:
+            break
+
+        cur_point = adjacency.get(cur_bind.obj, {}).get(-cur_bind.ptype)
+        if cur_point is None:
+            break
+
+        chain.append(cur_point)
+        black_obj = cur_bind.obj
+
+    return chain
+
+
+@Spanned()
 def ExportLine(obj: ExportPoint_Result):
     #
     track_diff_list = obj.diffList
@@ -403,6 +511,7 @@ def ExportLine(obj: ExportPoint_Result):
 
     logger.info("")
     logger.info(f"{ExportLine.__name__}():")
+    trace = logger.trace
 
     # Verify reference number of differential lines
     tdiff_count = len(track_diff_list)
@@ -432,57 +541,19 @@ def ExportLine(obj: ExportPoint_Result):
         ptStart = ep2
         ptEnd = ep1
 
-    # From the starting point of a single-end fold line
-    pl = Polyline2D(ptStart)
+    # Walk the single-ended polyline through the track adjacency map
     logger.info(f"Input Construct polygon from point list (x{len(share_point_list) + len(share_enpoint_2pt)})构建多边形:")
-    logger.info(f"  + starting point {pl.GetPointCount()} {ptStart}")
+    chain = ExportLineChain(ptStart, BuildTrackAdjacency([*share_point_list, *share_enpoint_2pt]))
 
-    # The shared endpoint of the polyline will bind two line objects
-    # When you find the opposite endpoint, get the line object
-    # To filter the current object to avoid reverse search for endpoints
-
-    loop_break = len(share_point_list) + 2
-    black_obj: PY_PCB_TRACK | None = None
-    while True:
-        # Cycle protection
-        loop_break -= 1
-        assert loop_break > 0, "Circulation protection (the maximum number of cycles exceeds the maximum cycle when building a folding line)"
+    # Design total number of end points - uninserted end points = number of lines
+    assert chain[-1] is ptEnd and len(chain) - 2 == len(share_point_list), "There is a continuity problem in the input line segment"
 
-        cur_bind: TPoint2i.bindInfo | None = None
-        for bind in pl.GetEnd().GetBindList():
-            # In terms of design, at most two bound line objects will be traversed.
-            # In terms of process, the last used object should be blocked to avoid reverse search
-            # The starting point A0 side is the end point A1 and the A1 side is B0 or A0 that cannot be searched for A0, so it must block the line object of A0A1
-            if bind.obj is black_obj:
-                continue
-            cur_bind = bind
-
-        # In terms of design, only one line object is bound to the end point. Shielding is required after the last use. This time there will be no object and the loop should end.
-        if cur_bind is None:
-            break
-
-        cur_pobj = cur_bind.obj
-        cur_ptype = cur_bind.ptype
-        cur_point: TPoint2i | None = None
-        for pt in share_point_list:
-            # If there is a matching opposite endpoint, ptNext will remain None
-            if pt.HasBind(cur_pobj, -cur_ptype) is False:
-                continue
-            # Insert the other endpoint of the line segment
-            pl.AddPoint(pt)
-            cur_point = pt
-            logger.info(f"  +endpoint {pl.GetPointCount()} {pt} → {cur_pobj}")
-            break
-
-        # Existing the next end -end point reset loop
-        if cur_point is not None:
-            black_obj = cur_pobj
-            continue
-
-        # Design total number of end points - uninserted end points = number of lines
-        assert pl.GetPointCount() - 1 == len(share_point_list), "There is a continuity problem in the input line segment"
-
-        break
+    pl = Polyline2D(ptStart, xyStore=True)
+    logger.info(f"  + starting point {pl.GetPointCount()} {ptStart}")
+    for pt in chain[1:-1]:
+        pl.AddPoint(pt)
+        if trace:
+            logger.info(f"  +endpoint {pl.GetPointCount()} {pt}")
 
     # Insert the final endpoint
     pl.AddPoint(ptEnd)
@@ -503,3 +574,83 @@ def ExportLine(obj: ExportPoint_Result):
         tdiff_start,
         tdiff_end,
     )
+
+
+def SplitSelection(pyTrackList: TrackTable | List[PY_PCB_TRACK]) -> List[TrackTable]:
+    # Split a selection covering many pairs into groups of one single-ended polyline
+    # plus its reference differential lines, each group keeps the input track order
+    table = TrackTable.From(pyTrackList)
+    count = table.Count()
+
+    parent = list(range(count))
+
+    def find(i: int):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Lines sharing an endpoint belong to the same polyline
+    endpoint_rows: Dict[Tuple[int, int], List[int]] = {}
+    for i in range(count):
+        endpoint_rows.setdefault((table.sx[i], table.sy[i]), []).append(i)
+        endpoint_rows.setdefault((table.ex[i], table.ey[i]), []).append(i)
+    for rows in endpoint_rows.values():
+        for row in rows[1:]:
+            parent[find(row)] = find(rows[0])
+
+    component: Dict[int, List[int]] = {}
+    for i in range(count):
+        component.setdefault(find(i), []).append(i)
+
+    polyline_list = [rows for rows in component.values() if len(rows) > 1]
+    single_list = [rows[0] for rows in component.values() if len(rows) == 1]
+
+    # A single polyline (or none) is the original one-pair input, leave the checks to ExportPoint
+    if len(polyline_list) <= 1:
+        return [table]
+
+    logger.info("")
+    logger.info(f"{SplitSelection.__name__}():")
+
+    # Dangling endpoints of every polyline, collected in one pass over the endpoint index
+    polyline_index = {find(rows[0]): i for i, rows in enumerate(polyline_list)}
+    dangling_list: List[List[Tuple[int, int]]] = [[] for _ in polyline_list]
+    for key, pts in endpoint_rows.items():
+        if len(pts) == 1 and find(pts[0]) in polyline_index:
+            dangling_list[polyline_index[find(pts[0])]].append(key)
+
+    def getDistanceSum(row: int, key: Tuple[int, int]):
+        d1 = math.hypot(table.sx[row] - key[0], table.sy[row] - key[1])
+        d2 = math.hypot(table.ex[row] - key[0], table.ey[row] - key[1])
+        return d1 + d2
+
+    # Each independent line is a reference differential line of the polyline on the same layer
+    # with the same width that has the nearest dangling endpoint
+    group_list: List[List[int]] = [list(rows) for rows in polyline_list]
+    refer_list: List[List[Tuple[int, Tuple[int, int]]]] = [[] for _ in polyline_list]
+    for row in single_list:
+        best, best_key, best_d = -1, (0, 0), math.inf
+        for i, rows in enumerate(polyline_list):
+            if table.layer[rows[0]] != table.layer[row] or table.width[rows[0]] != table.width[row]:
+                continue
+            for key in dangling_list[i]:
+                d = getDistanceSum(row, key)
+                if d < best_d:
+                    best, best_key, best_d = i, key, d
+        assert best >= 0, f"Error (reference differential line {table.tracks[row]} matches no polyline of the same layer and width)"
+        group_list[best].append(row)
+        refer_list[best].append((row, best_key))
+
+    # One head reference line and at most one tail reference line at the other end of every polyline
+    for i, rows in enumerate(polyline_list):
+        refer = refer_list[i]
+        assert len(refer) in (1, 2), f"Error (group {i + 1} {table.tracks[rows[0]]} has {len(refer)} reference differential lines, 1 or 2 are supported)"
+        assert len(refer) == 1 or refer[0][1] != refer[1][1], f"Error (group {i + 1} {table.tracks[rows[0]]} has two reference differential lines at the same end)"
+
+    ret: List[TrackTable] = []
+    for rows in group_list:
+        rows.sort()
+        ret.append(table.Subset(rows))
+        logger.info(f"  group {len(ret)} track:{len(rows)} {table.tracks[rows[0]]}")
+    return ret
@@ -0,0 +1,320 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, List, Sequence, Tuple
+
+from .include import G_PLUGIN_LOG_FILE
+from .logger import getLogger, redirectFileHandlers
+from .mathLib import (
+    np,
+    G_NUMPY_ENABLE,
+    OffsetPolylineArray,
+    Rad,
+    Vec2D,
+    ConstVec2D,
+    Segment2D,
+    Dir2D,
+    G_DIR_P90DEG,
+    G_DIR_N90DEG,
+)
+
+# 本模块只做纯几何计算 不依赖 pcbnew 可在进程池子进程中导入
+if TYPE_CHECKING:
+    from .TrackExport import Polyline2D, TPoint2i
+
+logger = getLogger("vec-kernel")
+logger.addFileHandler(G_PLUGIN_LOG_FILE)
+
+
+class VecList2D:
+    def __init__(self) -> None:
+        self._i: int = 0
+        self._vecList: List[Vec2D | ConstVec2D | Segment2D] = []
+
+    def GetList(self):
+        return self._vecList
+
+    def Append(self, vec: Vec2D | ConstVec2D | Segment2D):
+        self._vecList.append(vec)
+
+    def Count(self):
+        return len(self._vecList)
+
+    def pMoveStart(self):
+        self._i = 0
+
+    def pMoveEnd(self):
+        self._i = self.Count() - 1
+
+    def pMoveNext(self):
+        if self._i >= self.Count() - 1:
+            return False
+        self._i += 1
+        return True
+
+    def pMovePrev(self):
+        if self._i <= 0:
+            return False
+        self._i -= 1
+        return True
+
+    def pGet(self):
+        return self._i
+
+    def pSet(self, p: int):
+        if self._i >= self.Count():
+            raise OverflowError
+        if self._i <= 0:
+            raise ValueError
+        self._i = p
+
+    def GetCurrent(self):
+        return self._vecList[self._i]
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__} 0x{id(self):X} vec:{self.Count()}>"
+
+
+def MakeVec2D(xy1xy2: Tuple["TPoint2i | ConstVec2D", "TPoint2i | ConstVec2D"]):
+    ptStart, ptEnd = xy1xy2
+    x = ptEnd.x - ptStart.x
+    y = ptEnd.y - ptStart.y
+    vec = Vec2D(x, y)
+    vec.SetBias([Vec2D(ptStart.x, ptStart.y)])
+    return vec
+
+
+def PolylineToVecList(pl: "Polyline2D | Sequence[TPoint2i | ConstVec2D]"):
+    # 折线 或 端点序列(进程池任务只有坐标)
+    mvec = VecList2D()
+
+    logger.info("")
+    logger.info(f"{PolylineToVecList.__name__}():")
+    trace = logger.trace
+
+    ptList = pl.GetList() if hasattr(pl, "GetList") else pl
+    assert len(ptList) >= 2, f"失败(只有{len(ptList)}个端点的非法折线)"
+
+    logger.info("折线向量化:")
+    for pt1, pt2 in zip(ptList, ptList[1:]):
+        # 由端点直接构建锚定线段 不经过 Vec2D 与偏置列表
+        seg = Segment2D.FromPoints(pt1, pt2)
+        mvec.Append(seg)
+        if trace:
+            logger.info(f"  +向量{mvec.Count()} {seg}")
+
+    return mvec
+
+
+G_RAD_P90DEG = Rad.fromDeg(90)
+G_RAD_N90DEG = Rad.fromDeg(-90)
+
+
+def CheckPairPolar(
+    referVec: Vec2D | Segment2D,
+    diffPt2: Tuple["TPoint2i | ConstVec2D", "TPoint2i | ConstVec2D"],
+    rad_tolerance=0.000001
+):
+    logger.info("")
+    logger.info(f"{CheckPairPolar.__name__}():")
+
+    if isinstance(referVec, Segment2D):
+        referVec = referVec.toVec2D()
+    diffVec = MakeVec2D(diffPt2)
+    logger.info("检查输入差分对:")
+    logger.info(f"  参考 {referVec}")
+    logger.info(f"  差分 {diffVec}")
+
+    ret = Vec2D.isParallel(diffVec, referVec, rad_tolerance)
+    assert ret == 1 or ret == -1, "错误(起点差分对不平行)"
+
+    if ret == -1:
+        diffVec = MakeVec2D((diffPt2[1], diffPt2[0]))
+
+    logger.info(f"  精度 {Vec2D.GetSinIncludedAngle(diffVec, referVec):+.12f}(sin)")
+    pair_distance = Vec2D.GetParallelDistance(diffVec, referVec)
+    logger.info(f"  间距 {pair_distance:+}(unit)")
+
+    assert pair_distance != 0, "错误(差分对(头)间距为零)"
+
+    return ret, pair_distance
+
+
+def GenerateNewPointList(
+    sVecList: VecList2D,
+    vec_distance: int,
+):
+    logger.info("")
+    logger.info(f"{GenerateNewPointList.__name__}():")
+    trace = logger.trace
+
+    vec_rotate = G_DIR_P90DEG if vec_distance > 0 else G_DIR_N90DEG
+    logger.info("旋转极性:")
+    logger.info(f"  {vec_rotate}")
+
+    # 重置单端向量表指针
+    sVecList.pMoveStart()
+
+    def GetJunction(a: Segment2D, b: Segment2D):
+        pt = Segment2D.GetLinearJunction(a, b)
+        assert pt is not None, "错误(两条虚拟差分线不存在线性交点)"
+        return pt
+
+    # 从单端向量表转换指定距离的差分线段表
+    logger.info("构造差分向量表:")
+    segList: List[Segment2D] = []
+    for v in sVecList.GetList():
+        # 差分线段 = 单端线段起点沿法向(±90度)平移 方向不变
+        seg = v.OffsetNormal(vec_distance)
+        segList.append(seg)
+        if trace:
+            logger.info(f"  +向量{len(segList)} {seg}")
+
+    # 导出有序交点表 相邻差分线段的交点 + 末尾线段的结束点
+    ptList = VecList2D()
+    logger.info("计算多段差分交点:")
+    for seg1, seg2 in zip(segList, segList[1:]):
+        pt2f = GetJunction(seg1, seg2)
+        ptList.Append(vec=pt2f)
+        if trace:
+            logger.info(f"  +交点{ptList.Count()} ({pt2f.x},{pt2f.y})")
+
+    vecEnd = segList[-1].end
+    ptList.Append(vecEnd)
+    logger.info(f"  +终点{ptList.Count()} ({vecEnd.x},{vecEnd.y})")
+
+    return ptList
+
+
+def GenerateNewPointListArray(
+    sPolyline: "Polyline2D",
+    vec_distance: int,
+):
+    # 单端折线坐标 (N+1, 2)
+    xArray, yArray = sPolyline.GetXY()
+    xy = np.column_stack((np.frombuffer(xArray, dtype=np.int64), np.frombuffer(yArray, dtype=np.int64)))
+    return GenerateNewPointListXY(xy, vec_distance)
+
+
+def GenerateNewPointListXY(
+    xy: "np.ndarray",
+    vec_distance: int,
+) -> List[Tuple[float, float]]:
+    logger.info("")
+    logger.info(f"{GenerateNewPointListXY.__name__}():")
+    trace = logger.trace
+
+    # 一次性计算全部差分线段与交点
+    _, end, junction, parallel = OffsetPolylineArray(xy, vec_distance)
+    assert not parallel.any(), "错误(两条虚拟差分线不存在线性交点)"
+
+    # 导出有序交点表 所有交点 + 终点 直接输出坐标元组
+    ptList: List[Tuple[float, float]] = [(x, y) for x, y in junction.tolist()]
+    logger.info("计算多段差分交点:")
+    if trace:
+        for i, (x, y) in enumerate(ptList, 1):
+            logger.info(f"  +交点{i} ({x},{y})")
+    x, y = end[-1].tolist()
+    ptList.append((x, y))
+    logger.info(f"  +终点{len(ptList)} ({x},{y})")
+
+    return ptList
+
+
+class PairJob:
+    def __init__(
+        self,
+        polyline: Sequence[Tuple[int, int]],
+        diffStart: Tuple[Tuple[int, int], Tuple[int, int]],
+        diffEnd: Tuple[Tuple[int, int], Tuple[int, int]] | None,
+    ) -> None:
+        # 只保存坐标元组 可序列化后交给子进程
+        self.polyline: List[Tuple[int, int]] = [(int(x), int(y)) for x, y in polyline]
+        self.diffStart = diffStart
+        self.diffEnd = diffEnd
+
+
+class PairJob_Result:
+    def __init__(
+        self,
+        polarStart: int,
+        polarEnd: int | None,
+        distance: int,
+        ptList: List[Tuple[float, float]],
+    ) -> None:
+        self.polarStart: int = polarStart
+        self.polarEnd: int | None = polarEnd
+        self.distance: int = distance
+        self.ptList: List[Tuple[float, float]] = ptList
+
+
+def SolvePairJob(job: PairJob):
+    # 向量化 > 差分关系校验 > 差分交点 与 VecSolver.SolvePair 的几何部分一致
+    logger.info("")
+    logger.info(f"{SolvePairJob.__name__}():")
+    polyline = job.polyline
+    assert len(polyline) >= 2, f"失败(只有{len(polyline)}个端点的非法折线)"
+
+    def toPt2(xy2: Tuple[Tuple[int, int], Tuple[int, int]]):
+        return ConstVec2D(*xy2[0]), ConstVec2D(*xy2[1])
+
+    # numpy 路径只需要首尾两段向量做极性校验 整条折线向量化仅用于纯 Python 回退
+    if G_NUMPY_ENABLE:
+        vecList = None
+        referStart = MakeVec2D(toPt2((polyline[0], polyline[1])))
+        referEnd = MakeVec2D(toPt2((polyline[-2], polyline[-1])))
+    else:
+        vecList = PolylineToVecList([ConstVec2D(x, y) for x, y in polyline])
+        referStart = vecList.GetList()[0]
+        referEnd = vecList.GetList()[-1]
+
+    polarStart, distanceStart = CheckPairPolar(referStart, toPt2(job.diffStart))  # type: ignore
+
+    polarEnd: int | None = None
+    if job.diffEnd is not None:
+        polarEnd, distanceEnd = CheckPairPolar(referEnd, toPt2(job.diffEnd))  # type: ignore
+        assert abs(abs(distanceStart) - abs(distanceEnd)) < 10, f"失败(头尾的差分间距不一致) 间距差={distanceStart - distanceEnd}"
+
+    # 有符号差分线距 负号代表参考差分线在单端折线的逆角度方向
+    distance = int(distanceStart)
+
+    # 通过差分线距 生成新差分折线交点列表 有 numpy 时批量计算
+    if vecList is None:
+        ptList = GenerateNewPointListXY(np.array(polyline, dtype=np.int64), distance)
+    else:
+        ptList = [pt.toTuple() for pt in GenerateNewPointList(vecList, distance).GetList()]
+
+    return PairJob_Result(polarStart, polarEnd, distance, ptList)
+
+
+# 少于该数量的任务在当前进程计算 进程启动开销大于收益
+G_PAIR_POOL_MIN_JOBS = 4
+
+
+def IsEmbeddedInterpreter():
+    # KiCad 内嵌解释器: sys.executable 是 KiCad 程序本身 进程池无法用它启动子进程
+    # 编辑器中运行时 pcbnew.GetBoard() 返回当前板 fork 出的 KiCad 进程同样不可用
+    if not os.path.basename(sys.executable or "").lower().startswith("python"):
+        return True
+    getBoard = getattr(sys.modules.get("pcbnew"), "GetBoard", None)
+    return getBoard is not None and getBoard() is not None
+
+
+def _InitPairWorker():
+    # 子进程写入各自的 plugin-<pid>.log 不与主进程交错写入 plugin.log
+    root, ext = os.path.splitext(G_PLUGIN_LOG_FILE)
+    redirectFileHandlers(G_PLUGIN_LOG_FILE, f"{root}-{os.getpid()}{ext}")
+
+
+def RunPairJobs(jobList: List[PairJob], workers: int = 0) -> List[PairJob_Result]:
+    # workers <= 1 时在当前进程顺序计算 否则分发到进程池 结果保持任务顺序
+    if workers <= 1 or len(jobList) < G_PAIR_POOL_MIN_JOBS:
+        return [SolvePairJob(job) for job in jobList]
+    if IsEmbeddedInterpreter():
+        logger.info(f"{RunPairJobs.__name__}(): 运行于 KiCad 内嵌解释器 忽略 workers={workers}")
+        return [SolvePairJob(job) for job in jobList]
+
+    workers = min(workers, len(jobList), os.cpu_count() or 1)
+    logger.info(f"{RunPairJobs.__name__}(): {len(jobList)} jobs, {workers} workers")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_InitPairWorker) as pool:
+        return list(pool.map(SolvePairJob, jobList, chunksize=max(1, len(jobList) // (workers * 4))))
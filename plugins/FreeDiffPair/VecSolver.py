@@ -1,5 +1,4 @@
-from typing import List, Tuple
-import pcbnew
+from typing import Iterable, List, Tuple
 
 from .TrackExport import (
     Polyline2D,
@@ -10,12 +9,15 @@ from .TrackExport import (
     ExportPoint_Result,
     ExportLine,
     ExportLine_Result,
+    SplitSelection,
 )
 
-from .include import G_PLUGIN_LOG_FILE
+from .include import G_PLUGIN_LOG_FILE, G_PLUGIN_REFILL_ZONES, G_PLUGIN_TRACEMALLOC, G_PLUGIN_TRACEMALLOC_TOP
 
 
 from .logger import getLogger
+from .span import RecordSpans, Span, SpanRecorder
+from .profiler import Profiled
 
 
 from .mathLib import (
@@ -25,290 +27,105 @@ from .mathLib import (
     Vec2D,
 )
 
-from .kiLib import PY_PCB_TRACK, XY2KiVECTOR2I, make_PCB_TRACK, make_SHAPE_CIRCLE  # noqa: F401
+from .VecKernel import (
+    G_NUMPY_ENABLE,
+    MakeVec2D,
+    PolylineToVecList,
+    CheckPairPolar,
+    GenerateNewPointList,
+    GenerateNewPointListArray,
+    PairJob,
+    PairJob_Result,
+    SolvePairJob,
+    RunPairJobs,
+)
+
+from .kiLib import PY_BOARD_COMMIT, PY_PCB_TRACK, TrackTable, GetSelectedTracks, GetTrackBoundingBoxes, RefillZonesInBox, XY2KiVECTOR2I, make_PCB_TRACK, make_SHAPE_CIRCLE  # noqa: F401
 from .kiLib import toKiUnit, fromKiUnit  # noqa: F401
+from .kiLib import pcbnew  # 板后端 (pcbnew 或 kiMemory) 仅用于类型注解
 
 logger = getLogger("vec-solver")
 logger.addFileHandler(G_PLUGIN_LOG_FILE)
 
 
-class VecList2D:
-    def __init__(self) -> None:
-        self._i: int = 0
-        self._vecList: List[Vec2D] = []
-
-    def GetList(self):
-        return self._vecList
-
-    def Append(self, vec: Vec2D):
-        self._vecList.append(vec)
-
-    def Count(self):
-        return len(self._vecList)
-
-    def pMoveStart(self):
-        self._i = 0
-
-    def pMoveEnd(self):
-        self._i = self.Count() - 1
-
-    def pMoveNext(self):
-        if self._i >= self.Count() - 1:
-            return False
-        self._i += 1
-        return True
-
-    def pMovePrev(self):
-        if self._i <= 0:
-            return False
-        self._i -= 1
-        return True
-
-    def pGet(self):
-        return self._i
-
-    def pSet(self, p: int):
-        if self._i >= self.Count():
-            raise OverflowError
-        if self._i <= 0:
-            raise ValueError
-        self._i = p
-
-    def GetCurrent(self):
-        return self._vecList[self._i]
-
-    def __str__(self) -> str:
-        return f"<{self.__class__.__name__} 0x{id(self):X} vec:{self.Count()}>"
-
-
-def MakeVec2D(xy1xy2: Tuple[TPoint2i, TPoint2i]):
-    ptStart, ptEnd = xy1xy2
-    x = ptEnd.x - ptStart.x
-    y = ptEnd.y - ptStart.y
-    vec = Vec2D(x, y)
-    vec.SetBias([Vec2D(ptStart.x, ptStart.y)])
-    return vec
-
-
-def PolylineToVecList(pl: Polyline2D):
-    mvec = VecList2D()
-
-    logger.info("")
-    logger.info(f"{PolylineToVecList.__name__}():")
-
-    # 移动线段指针到开头
-    pl.pMoveStart()
-
-    logger.info("折线向量化:")
-    loop_break = pl.GetPointCount() + 2
-    while True:
-        loop_break -= 1
-        assert loop_break > 0, "循环保护(构建向量时超出最大循环次数)"
-
-        line = pl.GetCurrent()
-
-        # 设计上不该出现这种情况 用于修正静态类型检查(排除None类型)
-        assert line is not None, f"失败(只有{pl.GetPointCount()}个端点的非法折线)"
-
-        # 构建向量 加入集合向量
-        vec = MakeVec2D(line)
-        mvec.Append(vec)
-        logger.info(f"  +向量{mvec.Count()} {vec}")
-
-        if pl.pMoveNext() is False:
-            break
-
-    return mvec
-
-
-G_RAD_P90DEG = Rad.fromDeg(90)
-G_RAD_N90DEG = Rad.fromDeg(-90)
-
-
-def CheckPairPolar(
-    referVec: Vec2D,
-    diffPt2: Tuple[TPoint2i, TPoint2i],
-    rad_tolerance=0.000001
-):
-    logger.info("")
-    logger.info(f"{CheckPairPolar.__name__}():")
-
-    diffVec = MakeVec2D(diffPt2)
-    logger.info("检查输入差分对:")
-    logger.info(f"  参考 {referVec}")
-    logger.info(f"  差分 {diffVec}")
-
-    ret = Vec2D.isParallel(diffVec, referVec, rad_tolerance)
-    assert ret == 1 or ret == -1, "错误(起点差分对不平行)"
-
-    if ret == -1:
-        diffVec = MakeVec2D((diffPt2[1], diffPt2[0]))
-
-    logger.info(f"  精度 {Vec2D.GetIncludedAngle(diffVec, referVec).toDegFloat():+.12f}(deg)")
-    pair_distance = Vec2D.GetParallelDistance(diffVec, referVec)
-    logger.info(f"  间距 {pair_distance:+}(unit)")
-
-    assert pair_distance != 0, "错误(差分对(头)间距为零)"
-
-    return ret, pair_distance
-
-
-def GenerateNewPointList(
-    sVecList: VecList2D,
-    vec_distance: int,
-):
-    logger.info("")
-    logger.info(f"{GenerateNewPointList.__name__}():")
-
-    vec_rotate = G_RAD_P90DEG if vec_distance > 0 else G_RAD_N90DEG
-    logger.info("旋转极性:")
-    logger.info(f"  {vec_rotate}")
-
-    # 重置单端向量表指针
-    sVecList.pMoveStart()
-
-    def GetDiffLine(vec: Vec2D, distance: int | float, rotate: Rad):
-        # 垂向量 原向量旋转±90度后调整长度 长度必须去除负号
-        vec_r90_dis = vec.Rotate(rotate).SetNorm(abs(distance))
-        # 差分向量只需要计算起点 = 原向量偏置(头) + 垂向量
-        ptStart = (vec.bias + vec_r90_dis).withBias
-        # 基于单端向量构建差分向量
-        vec_vdiff = vec.Clone()
-        vec_vdiff.SetBias([ptStart])
-
-        return vec_vdiff
-
-    def GetJunction(a, b):
-        pt = Vec2D.GetLinearJunction(a, b)
-        assert pt is not None, "错误(两条虚拟差分线不存在线性交点)"
-        return pt
-
-    # 从单端向量表转换指定距离的差分向量表
-    logger.info("构造差分向量表:")
-    vecList = VecList2D()
-    for v in sVecList.GetList():
-        vec = GetDiffLine(v, vec_distance, vec_rotate)
-        vecList.Append(vec)
-        logger.info(f"  +向量{vecList.Count()} {vec}")
-
-    # 导出有序交点表
-    ptList = VecList2D()
-    logger.info("计算多段差分交点:")
-    loop_break = vecList.Count() + 2
-    while True:
-        loop_break -= 1
-        assert loop_break > 0, "循环保护(构建向量时超出最大循环次数)"
-        # 获取当前向量
-        vec1 = vecList.GetCurrent()
-        # 后移向量表指针 到结尾时无法移动 增加终点 退出循环
-        if vecList.pMoveNext() is False:
-            # 增加终点 末尾向量的结束点
-            vecEnd = vec1.withBias
-            ptList.Append(vecEnd)
-            logger.info(f"  +终点{ptList.Count()} ({vecEnd.x},{vecEnd.y})")
-            break
-        # 获取后一个向量 指针已经后移
-        vec2 = vecList.GetCurrent()
-
-        pt2f = GetJunction(vec1, vec2)
-        ptList.Append(vec=pt2f)
-        logger.info(f"  +交点{ptList.Count()} ({pt2f.x},{pt2f.y})")
-
-        continue
-
-    return ptList
-
-
 def InstanceNewDiff(
-    ptList: VecList2D,
+    ptList: List[Tuple[float, float]],
     diffStart: Tuple[TPoint2i, TPoint2i],
     diffEnd: Tuple[TPoint2i, TPoint2i] | None,
     info: ExportInfo_Result,
     board: pcbnew.BOARD,
+    commit: PY_BOARD_COMMIT,
 ):
     logger.info("")
     logger.info(f"{InstanceNewDiff.__name__}():")
-    
-    
-    
+    trace = logger.trace
+
+    # 端点列表的结构 无起点 仅有 所有交点 + 终点
+    # 双差分对输入时 终点不使用 最后一个交点即参考差分线(尾)的起点
+    # 单差分对输入时 终点作为最后那根新线路的终点
+    vertexList = ptList
+    if diffEnd is not None:
+        vertexList = vertexList[:-1]
+
+    # 先计算全部最终坐标 PCB线路按最终坐标一次创建 不再逐端点修改
+    xyList = [Vec2D(int(x), int(y)) for x, y in vertexList]
+
+    # 新线路延续参考差分线 创建时即分配参考差分线的网络
+    netcode = diffStart[0].GetBindFirst().obj.GetNetCode()
+    if diffEnd is not None:
+        netEnd = diffEnd[0].GetBindFirst().obj.GetNetCode()
+        if netEnd != netcode:
+            logger.warn(f"参考差分线头尾网络不一致 头:{netcode} 尾:{netEnd} 使用头网络")
+    logger.info(f"差分网络 {netcode}")
+
     # 转换差分折线 开始于参考差分线(头)的起点
     pl = Polyline2D(diffStart[0])
     logger.info("构造差分折线:")
     logger.info(f"  +固定起点{pl.GetPointCount()} {diffStart[0]}")
-    pl.AddPoint(diffStart[1])
-    logger.info(f"  +调整端点{pl.GetPointCount()} {diffStart[1]}")
 
-    # 端点列表的结构 无起点 仅有 所有交点 + 终点
-    
-    # 终点仅用于单差分对输入 作为最后那根新线路的终点 
-    # 必须弹出端点列表 不能参与建立新线路 以避免生成多一根新线路
-    ptEnd_indep = ptList.GetList().pop()
-    
-    # 双差分对输入时 倒数第二点是已存在
-    # 必须弹出端点列表 以避免生成多一根新线路
+    # 参考差分线(头)的终点 移动到第一个交点
+    headPt = diffStart[1]
+    assert headPt.BindCount() == 1, f"错误(非法差分折线 终点绑定了{headPt.BindCount()}个线路)"
+    headPt.SetXY(xyList[0].x, xyList[0].y)
+    # 参考差分线本身的绑定 之后该端点还会绑定第一根新线路
+    referList = [(headPt, headPt.GetBindFirst())]
+    pl.AddPoint(headPt)
+    logger.info(f"  +调整端点{pl.GetPointCount()} {headPt}")
+
+    # 相邻两个交点之间新建PCB线路
+    with Span("create", len(xyList) - 1):
+        for xy1, xy2 in zip(xyList, xyList[1:]):
+            pobj = PY_PCB_TRACK(make_PCB_TRACK(board, info.layer, xy1, xy2, netcode=netcode, thickness=info.width))
+
+            # 插入PCB线路 在提交时统一加入
+            pobj.AddTo(commit)
+
+            # 线路起点 绑定到折线目前的终点 线路终点 绑定到新的端点 后插入折线末尾
+            pl.GetEnd().AppendBind(TPoint2i.bindInfo(pobj, TPoint2i.TRACK_START_POINT))
+            thisPt = TPoint2i(xy2.x, xy2.y, TPoint2i.bindInfo(pobj, TPoint2i.TRACK_END_POINT))
+            pl.AddPoint(thisPt)
+            if trace:
+                logger.info(f"  +新建端点{pl.GetPointCount()} {thisPt}")
+
+    # 折线的终点 视为参考差分线(尾)的起点 参考差分线(尾)的终点插入折线
     if diffEnd is not None:
-        ptEndPrve = ptList.GetList().pop()
-    
-    for pt in ptList.GetList():
-    
-        # 折线的终点 视为当前遍历交点的上一点
-        prvePt = pl.GetEnd()
-        assert prvePt.BindCount() == 1, f"错误(非法差分折线 终点绑定了{prvePt.BindCount()}个线路)"
-        # 应用交点到折线终点
-        prvePt.SetXY(pt.x, pt.y)
-
-        # 构建PCB线路 以交点为起点 终点x+1
-        # 本次循环PCB线路的终点 设计上由下一轮循环(下一个交点)来设置
-        # 只有交点才能构建PCB线路 因为是由交点发起的 所以交点列表最后一点(终点)不能参与循环
-        # 最后一个交点必须在完成本层循环后 在独立设置 与参考差分线合并或和交点列表最后一点合并
-        pobj = PY_PCB_TRACK((board, pt, pt + Vec2D(1, 0)))
-        pobj.setWidth(info.width)
-        pobj.SetLayer(info.layer)
-
-        # 插入PCB线路
-        pobj.AddTo(board)
-
-        # 构建端点绑定信息
-        StartBind = TPoint2i.bindInfo(pobj, TPoint2i.TRACK_START_POINT)
-        EndBind = TPoint2i.bindInfo(pobj, TPoint2i.TRACK_END_POINT)
-
-        # 把线路起点 绑定到折线目前的终点
-        prvePt.AppendBind(StartBind)
-
-        # 把线路终点 绑定到新的端点 后插入多边形末尾
-        thisPt = TPoint2i(pt.x + 1, pt.y, EndBind)
-        pl.AddPoint(thisPt)
-        logger.info(f"  +新建端点{pl.GetPointCount()} {thisPt}")
-
-        continue
-
-    # 设置终点 折线的最后一点 应用到尾差分对的起点
-    if diffEnd is not None:
-        # 折线的终点 视为参考差分线(尾)的起点
-        endPt = pl.GetEnd()
-        assert endPt.BindCount() == 1, f"错误(非法差分折线 终点绑定了{endPt.BindCount()}个线路)"
-
-        # 参考差分线(尾)的起点 绑定到折线终点
-        endPt.AppendBind(diffEnd[0].GetBindFirst())
-        endPt.SetXY(ptEndPrve.x,ptEndPrve.y) # type: ignore
-        # 参考差分线(尾)的终点 插入折线 以方便后续设置
+        tailPt = diffEnd[0]
+        assert tailPt.BindCount() == 1, f"错误(非法差分折线 终点绑定了{tailPt.BindCount()}个线路)"
+        tailPt.SetXY(xyList[-1].x, xyList[-1].y)
+        referList.append((tailPt, tailPt.GetBindFirst()))
+        pl.GetEnd().AppendBind(tailPt.GetBindFirst())
         pl.AddPoint(diffEnd[1])
         logger.info(f"  +固定终点{pl.GetPointCount()} {diffEnd[1]}")
 
-    # 设置终点 交点列表的最后一点 应用到最后那根新线路
-    else:
-        endPt = pl.GetEnd()
-        assert endPt.BindCount() == 1, f"错误(非法差分折线 终点绑定了{endPt.BindCount()}个线路)"
-        # 在主循环中最后构建的PCB线路 依然保持在等待设置的状态
-        # 交点列表的最后一点 视为终点 设置到折线终点的坐标
-        endPt.SetXY(ptEnd_indep.x,ptEnd_indep.y)
-        
-    
-    # 更新折线内所有端点到绑定的PCB线路
+    # 新建线路已在最终坐标 只更新原有参考差分线被移动的端点
     logger.info("差分线段列表:")
-    for pt in pl.GetList():
-        logger.info(f" 更新线路 {pt}")
-        pt.Update()
+    with Span("update") as span:
+        for pt, bind in referList:
+            logger.info(f" 更新线路 {pt}")
+            # 修改前登记到提交 以便撤销
+            commit.Modify(bind.obj)
+            pt.Update([bind])
+            span.count += 1
 
     return pl
 
@@ -317,9 +134,11 @@ def AddCuShapeTrackLock(
     pl: Polyline2D,
     info: ExportInfo_Result,
     board: pcbnew.BOARD,
+    commit: PY_BOARD_COMMIT,
 ):
     logger.info("")
     logger.info(f"{AddCuShapeTrackLock.__name__}():")
+    trace = logger.trace
 
     width = info.width - toKiUnit(0.05)
 
@@ -333,80 +152,215 @@ def AddCuShapeTrackLock(
             xy,
             size=width,
         )
-        board.Add(kobj)
-        logger.info(f"  +CIRCLE {xy}")
-
+        commit.Add(kobj)
+        if trace:
+            logger.info(f"  +CIRCLE {xy}")
 
-def PluginMain(board: pcbnew.BOARD):
-    def GetInputTracks(board):
-        ret: List[PY_PCB_TRACK] = []
-        for track in board.GetTracks():
-            if not isinstance(track, pcbnew.PCB_TRACK):
-                raise TypeError
-            if track.IsSelected():
-                t = PY_PCB_TRACK(track)
-                ret.append(t)
-        return ret
 
-    inputList: List[PY_PCB_TRACK] = GetInputTracks(board)
+@Profiled("FreeDiffPair")
+def PluginMain(
+    board: pcbnew.BOARD,
+    workers: int = 0,
+    refillZones: bool = G_PLUGIN_REFILL_ZONES,
+    netcodes: Iterable[int] | None = None,
+):
+    # 各阶段计时(墙钟/CPU/数量) 结束时输出汇总 区分 解析/几何/pcbnew写入/日志 的耗时
+    # 可选 tracemalloc 统计各阶段的内存峰值/残留 与分配最多的代码行
+    # 失败时已记录的阶段挂在异常的 spans 属性上 命令行仍可写入清单
+    recorder: SpanRecorder | None = None
+    try:
+        with RecordSpans(G_PLUGIN_TRACEMALLOC, G_PLUGIN_TRACEMALLOC_TOP) as recorder:
+            result = _PluginMain(board, workers, refillZones, netcodes)
+        result.spans = recorder.toDict()
+    except Exception as e:
+        if recorder is not None:
+            e.spans = recorder.toDict()  # type: ignore[attr-defined]
+        raise
+    finally:
+        if recorder is not None:
+            for line in recorder.Summary():
+                logger.info(line)
+    return result
+
+
+def _PluginMain(
+    board: pcbnew.BOARD,
+    workers: int,
+    refillZones: bool,
+    netcodes: Iterable[int] | None,
+):
+    # 获取选择的线路 优先使用编辑器选择集 跳过过孔与圆弧
+    # 指定网络时(命令行) 直接使用这些网络的全部线路 不需要选择
+    with Span("select") as span:
+        if netcodes is not None:
+            selection = GetSelectedTracks(board, netcodes, selectedOnly=False)
+        else:
+            selection = GetSelectedTracks(board)
+        span.count += selection.scanned
+    inputList: List[PY_PCB_TRACK] = selection.tracks
+    logger.info(f"input track:{len(inputList)} source:{selection.source} scanned:{selection.scanned} time:{selection.elapsed * 1000:.3f}ms")
 
+    result = PluginMain_Result(len(inputList))
     if len(inputList) < 3:
-        return
-
+        return result
+
+    # 一次性读取所选线路的 起点/终点/线宽/层/网络 后续解析只访问该快照
+    with Span("snapshot", len(inputList)):
+        trackTable = TrackTable(inputList)
+
+    # 选择可包含多个差分对 按连通关系拆分为 单端折线 + 参考差分线 的分组
+    with Span("split") as span:
+        groupList = SplitSelection(trackTable)
+        span.count += len(groupList)
+
+    # 解析在主线程 纯几何求解可分发到进程池 workers > 1 时启用
+    with Span("extract", len(inputList)):
+        extractList = [ExtractPair(group) for group in groupList]
+    with Span("solve", len(extractList)):
+        jobResultList = RunPairJobs([extract.job for extract in extractList], workers)
+
+    # 先完成所有分组的求解 任一分组失败则不修改PCB
+    with Span("apply", len(extractList)):
+        solveList = [ApplyPairJob(extract, jobResult) for extract, jobResult in zip(extractList, jobResultList)]
+
+    # 更新交点 新建PCB线路 所有修改作为一次提交 只产生一次撤销与连接性更新
+    commit = PY_BOARD_COMMIT(board)
+    try:
+        with Span("commit", len(solveList)):
+            for solve in solveList:
+                CommitPair(solve, board, commit)
+    except BaseException:
+        # 新线路尚未加入PCB 恢复已移动的参考差分线端点
+        logger.error(f"commit failed, revert modify:{commit.Revert()}")
+        raise
+    with Span("push") as span:
+        added, modified, netcodes = commit.Push("FreeDiffPair")
+        span.count += added + modified
+    logger.info(f"commit add:{added} modify:{modified} net:{netcodes}")
+    result.pairs = len(solveList)
+    result.added = added
+    result.modified = modified
+    result.netcodes = netcodes
+
+    # 可选 只重新填充与新建/修改线路范围相交的覆铜
+    if refillZones:
+        with Span("refill") as span:
+            pushedList = commit.GetPushedList()
+            refill = RefillZonesInBox(board, GetTrackBoundingBoxes(pushedList), pushedList)
+            span.count += refill.zones
+        logger.info(f"refill zone:{refill.zones}/{refill.checked} time:{refill.elapsed * 1000:.3f}ms")
+        result.zones = refill.zones
+
+    return result
+
+
+class PluginMain_Result:
+    def __init__(self, tracks: int) -> None:
+        self.tracks: int = tracks
+        self.pairs: int = 0
+        self.added: int = 0
+        self.modified: int = 0
+        self.netcodes: List[int] = []
+        self.zones: int = 0
+        # SpanRecorder.toDict() 各阶段耗时
+        self.spans: dict = {}
+
+    def toDict(self):
+        return {
+            "tracks": self.tracks,
+            "pairs": self.pairs,
+            "added": self.added,
+            "modified": self.modified,
+            "netcodes": self.netcodes,
+            "zones": self.zones,
+            "spans": self.spans,
+        }
+
+
+class ExtractPair_Result:
+    def __init__(
+        self,
+        info: ExportInfo_Result,
+        line: ExportLine_Result,
+        job: PairJob,
+    ) -> None:
+        self.info: ExportInfo_Result = info
+        self.line: ExportLine_Result = line
+        self.job: PairJob = job
+
+
+class SolvePair_Result:
+    def __init__(
+        self,
+        ptList: List[Tuple[float, float]],
+        diffStart: Tuple[TPoint2i, TPoint2i],
+        diffEnd: Tuple[TPoint2i, TPoint2i] | None,
+        info: ExportInfo_Result,
+        referPolyline: Polyline2D,
+    ) -> None:
+        self.ptList: List[Tuple[float, float]] = ptList
+        self.diffStart: Tuple[TPoint2i, TPoint2i] = diffStart
+        self.diffEnd: Tuple[TPoint2i, TPoint2i] | None = diffEnd
+        self.info: ExportInfo_Result = info
+        self.referPolyline: Polyline2D = referPolyline
+
+
+def ExtractPair(trackTable: TrackTable):
     # 解析PCB上选择的线路 线路 > 端点 > 折线
-    infoResult = ExportInfo(inputList)
-    pointResult = ExportPoint(inputList)
+    infoResult = ExportInfo(trackTable)
+    pointResult = ExportPoint(trackTable)
     lineResult = ExportLine(pointResult)
 
-    # 单端折线 转换到向量表
-    vecList = PolylineToVecList(lineResult.sReferPolyline)
+    # 几何求解只需要坐标 转换为可序列化的任务
+    def toXY2(pt2: Tuple[TPoint2i, TPoint2i]):
+        return (pt2[0].x, pt2[0].y), (pt2[1].x, pt2[1].y)
 
-    # 校验 起始侧 参考差分线和单端折线 的差分关系正确性
-    vecList.pMoveStart()
-    polarStart, distanceStart = CheckPairPolar(
-        vecList.GetCurrent(),
-        lineResult.dReferStart,
+    xArray, yArray = lineResult.sReferPolyline.GetXY()
+    job = PairJob(
+        list(zip(xArray, yArray)),
+        toXY2(lineResult.dReferStart),
+        toXY2(lineResult.dReferEnd) if lineResult.dReferEnd is not None else None,
     )
-    if polarStart == 1:
+    return ExtractPair_Result(infoResult, lineResult, job)
+
+
+def ApplyPairJob(extract: ExtractPair_Result, jobResult: PairJob_Result):
+    lineResult = extract.line
+
+    # 按差分关系的极性 调整参考差分线的方向
+    if jobResult.polarStart == 1:
         diffStart = lineResult.dReferStart
     else:
         diffStart = (lineResult.dReferStart[1], lineResult.dReferStart[0])
 
-    # 校验 结束侧 参考差分线和单端折线 的差分关系正确性
-
+    diffEnd = None
     if lineResult.dReferEnd is not None:
-        vecList.pMoveEnd()
-        polarEnd, distanceEnd = CheckPairPolar(
-            vecList.GetCurrent(),
-            lineResult.dReferEnd,
-        )
-        assert abs(abs(distanceStart) - abs(distanceEnd)) < 10, f"失败(头尾的差分间距不一致) 间距差={distanceStart - distanceEnd}"
-
-        if polarEnd == 1:
+        if jobResult.polarEnd == 1:
             diffEnd = lineResult.dReferEnd
         else:
             diffEnd = (lineResult.dReferEnd[1], lineResult.dReferEnd[0])
-    else:
-        diffEnd = None
 
-    # 有符号差分线距 负号代表参考差分线在单端折线的逆角度方向
-    distance = int(distanceStart)
+    return SolvePair_Result(jobResult.ptList, diffStart, diffEnd, extract.info, lineResult.sReferPolyline)
+
+
+def SolvePair(trackTable: TrackTable):
+    extract = ExtractPair(trackTable)
+    return ApplyPairJob(extract, SolvePairJob(extract.job))
 
-    # 通过差分线距 生成新差分折线交点列表
-    ptList = GenerateNewPointList(vecList, distance)
 
+def CommitPair(solve: SolvePair_Result, board: pcbnew.BOARD, commit: PY_BOARD_COMMIT):
     # 更新交点 新建PCB线路
-    refer_pl = lineResult.sReferPolyline
     diff_pl = InstanceNewDiff(
-        ptList,
-        diffStart,
-        diffEnd,
-        infoResult,
+        solve.ptList,
+        solve.diffStart,
+        solve.diffEnd,
+        solve.info,
         board,
+        commit,
     )
 
     # 增加交点锁定 新建PCB形状
-    # AddCuShapeTrackLock(refer_pl, infoResult, board)
-    # AddCuShapeTrackLock(diff_pl, infoResult, board)
+    # AddCuShapeTrackLock(solve.referPolyline, solve.info, board, commit)
+    # AddCuShapeTrackLock(diff_pl, solve.info, board, commit)
 
-    return
+    return diff_pl
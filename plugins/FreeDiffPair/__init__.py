@@ -1,6 +1,17 @@
 import sys, os
+import multiprocessing
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from .main import FreeAngleDifferentialPair
 
-FreeAngleDifferentialPair().register()
+# Outside KiCad (pcbnew missing) the modules are used on the in-memory backend, nothing to register
+try:
+    import pcbnew
+except ImportError:
+    pcbnew = None
+
+# Worker processes of the solver pool only import the pcbnew-free kernel,
+# they must not register the plugin or truncate plugin.log again
+if multiprocessing.parent_process() is None and pcbnew is not None:
+    from .main import FreeAngleDifferentialPair
+
+    FreeAngleDifferentialPair().register()
@@ -0,0 +1,242 @@
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+from . import kiMemory
+from .logger import disableLogging
+from .kiLib import PY_BOARD_COMMIT, TrackTable, GetSelectedTracks, SetBackend, GetBackend
+from .mathLib import G_NUMPY_ENABLE, np
+from .TrackExport import ExportInfo, ExportPoint, ExportLine
+from .VecKernel import PolylineToVecList, CheckPairPolar, GenerateNewPointList, GenerateNewPointListXY
+from .VecSolver import InstanceNewDiff, PluginMain
+
+# Scaling benchmark of the solver pipeline on synthetic boards
+#
+#   python -m FreeDiffPair.bench --sizes 10 100 1000 10000 100000 --repeat 3 -o bench.json
+#
+# Each case is a random single-ended polyline of N segments with a head (and optionally
+# a tail) reference differential line. Every pipeline stage is timed on its own, the
+# report holds the timings per case and the fitted exponent t ~ N^k of each stage,
+# so a stage drifting towards O(N^2) stands out. Boards are generated on the in-memory
+# backend by default, generation is not timed.
+
+G_BENCH_STAGES = (
+    "ExportInfo",
+    "ExportPoint",
+    "ExportLine",
+    "PolylineToVecList",
+    "CheckPairPolar",
+    "GenerateNewPointList",
+    "GenerateNewPointListXY",
+    "InstanceNewDiff",
+    "Push",
+    "PluginMain",
+)
+
+# Sizes below this are dominated by constant overhead and not used for the exponent
+G_BENCH_FIT_MIN_SIZE = 100
+
+
+def GenerateBoard(
+    segments: int,
+    tail: bool = True,
+    seed: int = 0,
+    angleStep: int = 0,
+    length: int = 1000000,
+    gap: int = 300000,
+    width: int = 150000,
+):
+    # Random polyline with turns of 15..150 degrees (multiples of angleStep when given),
+    # the tracks are added in random order like a real selection.
+    # Reference lines reuse the integer direction of the first/last segment so they are exactly parallel
+    pcbnew = GetBackend()
+    rnd = random.Random(seed)
+    board = pcbnew.BOARD()
+
+    def add(xy1, xy2, netcode):
+        track = pcbnew.PCB_TRACK(board)
+        track.SetStartEnd(pcbnew.VECTOR2I(*xy1), pcbnew.VECTOR2I(*xy2))
+        track.SetWidth(width)
+        track.SetLayer(pcbnew.F_Cu)
+        track.SetNetCode(netcode)
+        track.SetSelected()
+        board.Add(track)
+
+    def turn():
+        if angleStep > 0:
+            deg = rnd.choice([a for a in range(angleStep, 151, angleStep) if a >= 15])
+        else:
+            deg = rnd.uniform(15.0, 150.0)
+        return math.radians(deg) * rnd.choice((1, -1))
+
+    heading = rnd.uniform(0, 2 * math.pi) if angleStep == 0 else 0.0
+    pts = [(0, 0)]
+    for i in range(segments):
+        if i != 0:
+            heading += turn()
+        step = length * rnd.uniform(0.5, 3.0)
+        x, y = pts[-1]
+        pts.append((x + round(step * math.cos(heading)), y + round(step * math.sin(heading))))
+
+    lines = list(zip(pts, pts[1:]))
+    rnd.shuffle(lines)
+    for xy1, xy2 in lines:
+        add(xy1, xy2, 1)
+
+    def offset(a, b):
+        # Left normal of a->b scaled to gap
+        dx, dy = b[0] - a[0], b[1] - a[1]
+        n = math.hypot(dx, dy)
+        return round(-dy / n * gap), round(dx / n * gap), dx, dy
+
+    ox, oy, dx, dy = offset(pts[0], pts[1])
+    add((pts[0][0] + ox, pts[0][1] + oy), (pts[0][0] + ox + dx, pts[0][1] + oy + dy), 2)
+    if tail:
+        ox, oy, dx, dy = offset(pts[-2], pts[-1])
+        add((pts[-1][0] + ox - dx, pts[-1][1] + oy - dy), (pts[-1][0] + ox, pts[-1][1] + oy), 2)
+    return board
+
+
+def _Timed(timing: Dict[str, float], name: str, func: Callable, *args):
+    t0 = time.perf_counter()
+    ret = func(*args)
+    timing[name] = time.perf_counter() - t0
+    return ret
+
+
+def RunCase(segments: int, tail: bool, seed: int, angleStep: int) -> Dict[str, float]:
+    # Stages one by one on one board, then the whole PluginMain on a fresh copy
+    timing: Dict[str, float] = {}
+    board = GenerateBoard(segments, tail, seed, angleStep)
+    table = TrackTable(GetSelectedTracks(board).tracks)
+
+    info = _Timed(timing, "ExportInfo", ExportInfo, table)
+    point = _Timed(timing, "ExportPoint", ExportPoint, table)
+    line = _Timed(timing, "ExportLine", ExportLine, point)
+    vecList = _Timed(timing, "PolylineToVecList", PolylineToVecList, line.sReferPolyline)
+
+    def checkPolar():
+        vecList.pMoveStart()
+        polar = CheckPairPolar(vecList.GetCurrent(), line.dReferStart)
+        polarEnd = None
+        if line.dReferEnd is not None:
+            vecList.pMoveEnd()
+            polarEnd = CheckPairPolar(vecList.GetCurrent(), line.dReferEnd)
+        return polar, polarEnd
+
+    (polarStart, distance), polarEnd = _Timed(timing, "CheckPairPolar", checkPolar)
+    ptList = _Timed(timing, "GenerateNewPointList", GenerateNewPointList, vecList, int(distance))
+    if G_NUMPY_ENABLE:
+        xArray, yArray = line.sReferPolyline.GetXY()
+        xy = np.column_stack((np.frombuffer(xArray, dtype=np.int64), np.frombuffer(yArray, dtype=np.int64)))
+        _Timed(timing, "GenerateNewPointListXY", GenerateNewPointListXY, xy, int(distance))
+
+    diffStart = line.dReferStart if polarStart == 1 else (line.dReferStart[1], line.dReferStart[0])
+    diffEnd = None
+    if line.dReferEnd is not None:
+        diffEnd = line.dReferEnd if polarEnd[0] == 1 else (line.dReferEnd[1], line.dReferEnd[0])
+    commit = PY_BOARD_COMMIT(board)
+    xyList = [pt.toTuple() for pt in ptList.GetList()]
+    _Timed(timing, "InstanceNewDiff", InstanceNewDiff, xyList, diffStart, diffEnd, info, board, commit)
+    _Timed(timing, "Push", commit.Push, "FreeDiffPair")
+
+    _Timed(timing, "PluginMain", PluginMain, GenerateBoard(segments, tail, seed, angleStep))
+    return timing
+
+
+def FitExponent(sizes: List[int], times: List[float]) -> float | None:
+    # Least squares slope of log(t) over log(N)
+    pts = [(math.log(n), math.log(t)) for n, t in zip(sizes, times) if n >= G_BENCH_FIT_MIN_SIZE and t > 0]
+    if len(pts) < 2:
+        pts = [(math.log(n), math.log(t)) for n, t in zip(sizes, times) if t > 0]
+    if len(pts) < 2:
+        return None
+    mx = sum(p[0] for p in pts) / len(pts)
+    my = sum(p[1] for p in pts) / len(pts)
+    sxx = sum((p[0] - mx) ** 2 for p in pts)
+    if sxx == 0:
+        return None
+    return sum((p[0] - mx) * (p[1] - my) for p in pts) / sxx
+
+
+def RunBench(sizes: List[int], tails: List[bool], repeat: int = 3, seed: int = 0, angleStep: int = 0) -> dict:
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": GetBackend().__name__,
+            "numpy": G_NUMPY_ENABLE,
+            "repeat": repeat,
+            "seed": seed,
+            "angleStep": angleStep,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "cases": [],
+        "scaling": {},
+    }
+    for tail in tails:
+        caseList = []
+        for n in sizes:
+            # Best of repeat runs, each run on a newly generated board
+            best: Dict[str, float] = {}
+            for r in range(repeat):
+                for name, t in RunCase(n, tail, seed, angleStep).items():
+                    best[name] = min(best.get(name, t), t)
+            case = {"segments": n, "tail": tail, "stages": best}
+            caseList.append(case)
+            report["cases"].append(case)
+            print(f"segments {n:>7} tail {int(tail)} " + " ".join(f"{k}:{v * 1000:.2f}ms" for k, v in best.items()), file=sys.stderr)
+
+        scaling = {}
+        for name in G_BENCH_STAGES:
+            caseTimes = [(c["segments"], c["stages"][name]) for c in caseList if name in c["stages"]]
+            k = FitExponent([c[0] for c in caseTimes], [c[1] for c in caseTimes])
+            if k is not None:
+                scaling[name] = round(k, 3)
+        report["scaling"]["tail" if tail else "head"] = scaling
+    return report
+
+
+def GetArgParser():
+    parser = argparse.ArgumentParser(prog="FreeDiffPair.bench", description="Scaling benchmark of the FreeDiffPair pipeline on synthetic boards.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000], help="segment counts (default: %(default)s)")
+    parser.add_argument("--reference", choices=["head", "tail", "both"], default="both", help="head only, head and tail, or both kinds of case")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the fastest is reported (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--angle-step", type=int, default=0, help="turn angles in multiples of this many degrees, 0 for arbitrary angles")
+    parser.add_argument("--backend", choices=["memory", "pcbnew"], default="memory", help="board backend (default: %(default)s)")
+    parser.add_argument("--log", action="store_true", help="keep writing plugin.log, by default logging is disabled")
+    parser.add_argument("-o", "--output", help="JSON report file (default: stdout)")
+    return parser
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = GetArgParser().parse_args(argv)
+
+    if args.backend == "memory":
+        SetBackend(kiMemory)
+    elif GetBackend() is kiMemory:
+        print("error: pcbnew is not available", file=sys.stderr)
+        return 2
+    if not args.log:
+        disableLogging()
+
+    tails = {"head": [False], "tail": [True], "both": [False, True]}[args.reference]
+    report = RunBench(sorted(args.sizes), tails, args.repeat, args.seed, args.angle_step)
+
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, "w", encoding="UTF-8") as f:
+            f.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+from .include import G_PLUGIN_LOG_FILE
+from .logger import getLogger
+from .VecSolver import PluginMain
+from . import kiMemory
+from .kiLib import GetBackend, pcbnew
+
+logger = getLogger("cli")
+logger.addFileHandler(G_PLUGIN_LOG_FILE)
+
+# Headless entry point, runs the same pipeline as the action plugin on a .kicad_pcb file
+#
+#   python -m FreeDiffPair.cli board.kicad_pcb --nets /USB_D+ /USB_D- -o out.kicad_pcb
+#   python -m FreeDiffPair.cli board.kicad_pcb --selection tracks.txt --in-place
+#
+# A selection file lists one track UUID per line, '#' starts a comment.
+
+
+def ReadSelectionFile(path: str) -> List[str]:
+    ret: List[str] = []
+    with open(path, "r", encoding="UTF-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line != "":
+                ret.append(line)
+    return ret
+
+
+def GetNetCodes(board: pcbnew.BOARD, names: List[str]) -> List[int]:
+    ret: List[int] = []
+    for name in names:
+        net = board.FindNet(name)
+        if net is None:
+            raise ValueError(f"net not found: {name}")
+        ret.append(net.GetNetCode())
+    return ret
+
+
+def SelectTracks(board: pcbnew.BOARD, uuids: List[str]) -> int:
+    # Mark the listed tracks selected, PluginMain then picks them up like a GUI selection
+    want = set(uuids)
+    count = 0
+    for track in board.GetTracks():
+        if track.m_Uuid.AsString() in want:
+            track.SetSelected()
+            count += 1
+    return count
+
+
+G_NO_SAVE_ERROR = "error: the in-memory backend cannot write .kicad_pcb files, use pcbnew or --dry-run"
+
+
+def CanSaveBoard() -> bool:
+    # The in-memory backend only reads .kicad_pcb files, output flags are rejected up front
+    return GetBackend() is not kiMemory
+
+
+def GetArgParser():
+    parser = argparse.ArgumentParser(prog="FreeDiffPair", description="Generate free angle differential pairs on a .kicad_pcb file.")
+    parser.add_argument("board", help="input .kicad_pcb file")
+    select = parser.add_mutually_exclusive_group(required=True)
+    select.add_argument("--nets", nargs="+", metavar="NAME", help="use every track of these nets as input")
+    select.add_argument("--selection", metavar="FILE", help="file with one track UUID per line")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("-o", "--output", help="output .kicad_pcb file")
+    output.add_argument("--in-place", action="store_true", help="overwrite the input board")
+    parser.add_argument("--dry-run", action="store_true", help="run the solver but do not save")
+    parser.add_argument("--workers", type=int, default=0, help="process pool size for the geometry stage (default: in-process)")
+    parser.add_argument("--refill-zones", action="store_true", help="refill the zones overlapping the generated tracks")
+    return parser
+
+
+def RunBoard(boardPath: str, nets: List[str] | None = None, selection: str | None = None, output: str | None = None, workers: int = 0, refillZones: bool = False) -> dict:
+    # Load, solve and optionally save one board, output None means dry run
+    # status is "ok", "error" (unreadable board, bad nets/selection) or "failed" (solver assertion)
+    ret = {"board": boardPath, "output": output, "status": "ok", "reason": "", "load": 0.0, "run": 0.0, "save": 0.0}
+
+    t0 = time.perf_counter()
+    try:
+        # pcbnew raises IOError/RuntimeError, the in-memory reader asserts on malformed files
+        board = GetBackend().LoadBoard(os.path.abspath(boardPath))
+    except (OSError, ValueError, RuntimeError, AssertionError) as e:
+        board = None
+        ret["reason"] = f"cannot load {boardPath}: {e}"
+    if board is None:
+        ret["status"] = "error"
+        ret["reason"] = ret["reason"] or f"cannot load {boardPath}"
+        return ret
+    ret["load"] = time.perf_counter() - t0
+
+    netcodes = None
+    try:
+        if nets is not None:
+            netcodes = GetNetCodes(board, nets)
+        else:
+            count = SelectTracks(board, ReadSelectionFile(selection))
+            logger.info(f"selected {count} tracks from {selection}")
+    except (OSError, ValueError) as e:
+        ret["status"] = "error"
+        ret["reason"] = f"{e}"
+        return ret
+
+    t0 = time.perf_counter()
+    try:
+        result = PluginMain(board, workers=workers, refillZones=refillZones, netcodes=netcodes)
+    except AssertionError as e:
+        # Keep the stages that ran before the failure in the manifest
+        logger.fatal(f"{boardPath}: {e}")
+        ret["status"] = "failed"
+        ret["reason"] = f"{e}"
+        ret["spans"] = getattr(e, "spans", {})
+        return ret
+    finally:
+        ret["run"] = time.perf_counter() - t0
+    ret.update(result.toDict())
+
+    if output is not None:
+        t0 = time.perf_counter()
+        GetBackend().SaveBoard(os.path.abspath(output), board)
+        ret["save"] = time.perf_counter() - t0
+
+    return ret
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = GetArgParser().parse_args(argv)
+
+    if not args.dry_run and args.output is None and not args.in_place:
+        print("error: one of -o/--output, --in-place or --dry-run is required", file=sys.stderr)
+        return 2
+    if not args.dry_run and not CanSaveBoard():
+        print(G_NO_SAVE_ERROR, file=sys.stderr)
+        return 2
+
+    output = None
+    if not args.dry_run:
+        output = args.board if args.in_place else args.output
+
+    ret = RunBoard(args.board, nets=args.nets, selection=args.selection, output=output, workers=args.workers, refillZones=args.refill_zones)
+    if ret["status"] == "error":
+        print(f"error: {ret['reason']}", file=sys.stderr)
+        return 2
+    if ret["status"] == "failed":
+        print(f"failed: {ret['reason']}", file=sys.stderr)
+        return 1
+
+    print(f"load {ret['load']:.3f}s run {ret['run']:.3f}s save {ret['save']:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
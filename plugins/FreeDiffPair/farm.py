@@ -0,0 +1,129 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List
+
+from .cli import G_NO_SAVE_ERROR, CanSaveBoard, RunBoard
+from .include import G_PLUGIN_LOG_FILE
+from .logger import getLogger
+
+logger = getLogger("farm")
+logger.addFileHandler(G_PLUGIN_LOG_FILE)
+
+# Batch entry point, runs the headless pipeline on many boards with one process per board
+#
+#   python -m FreeDiffPair.farm boards/ --nets /USB_D+ /USB_D- --output-dir out --workers 8 --manifest farm.json
+#   python -m FreeDiffPair.farm "boards/*.kicad_pcb" --selection-suffix .sel --dry-run
+#
+# Each board is loaded, solved and saved inside its own single-use worker process,
+# the geometry stage stays in-process there. A board that fails is recorded in the
+# manifest and does not stop the batch. A worker that dies (e.g. a pcbnew segfault)
+# only loses its own board, which is retried G_FARM_CRASH_RETRY times.
+
+G_FARM_CRASH_RETRY = 1
+
+# Workers are spawned, not forked: the parent has the waiting threads running and
+# pcbnew loaded, and a fork would copy their locks and SWIG state mid-use
+G_FARM_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def ListBoards(pattern: str) -> List[str]:
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.kicad_pcb")
+    return sorted(glob.glob(pattern))
+
+
+def GetOutputPath(boardPath: str, outputDir: str | None, inPlace: bool) -> str | None:
+    if inPlace:
+        return boardPath
+    if outputDir is None:
+        return None
+    return os.path.join(outputDir, os.path.basename(boardPath))
+
+
+def RunFarmJob(boardPath: str, nets: List[str] | None, selectionSuffix: str | None, output: str | None, refillZones: bool) -> dict:
+    selection = None
+    if nets is None:
+        selection = os.path.splitext(boardPath)[0] + selectionSuffix
+    try:
+        return RunBoard(boardPath, nets=nets, selection=selection, output=output, workers=0, refillZones=refillZones)
+    except Exception as e:
+        # Load/save exceptions and the like are only recorded in the manifest, other boards go on
+        return {"board": boardPath, "output": output, "status": "error", "reason": f"{type(e).__name__}: {e}"}
+
+
+def RunFarmJobIsolated(boardPath: str, nets: List[str] | None, selectionSuffix: str | None, output: str | None, refillZones: bool) -> dict:
+    # A pool per board, a crashed process cannot take other boards with it
+    reason = ""
+    for attempt in range(G_FARM_CRASH_RETRY + 1):
+        with ProcessPoolExecutor(max_workers=1, mp_context=G_FARM_MP_CONTEXT) as pool:
+            try:
+                return pool.submit(RunFarmJob, boardPath, nets, selectionSuffix, output, refillZones).result()
+            except BrokenProcessPool as e:
+                reason = f"{e}"
+                logger.warn(f"{boardPath}: worker crashed, attempt {attempt + 1}/{G_FARM_CRASH_RETRY + 1}")
+    return {"board": boardPath, "output": output, "status": "crashed", "reason": reason}
+
+
+def GetArgParser():
+    parser = argparse.ArgumentParser(prog="FreeDiffPair.farm", description="Run FreeDiffPair on a batch of .kicad_pcb files.")
+    parser.add_argument("boards", help="directory or glob pattern of .kicad_pcb files")
+    select = parser.add_mutually_exclusive_group(required=True)
+    select.add_argument("--nets", nargs="+", metavar="NAME", help="use every track of these nets as input, on every board")
+    select.add_argument("--selection-suffix", metavar="SUFFIX", help="per board selection file, <board name><SUFFIX>")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--output-dir", help="write the results into this directory")
+    output.add_argument("--in-place", action="store_true", help="overwrite the input boards")
+    output.add_argument("--dry-run", action="store_true", help="run the solver but do not save")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of boards processed at once (default: cpu count)")
+    parser.add_argument("--manifest", default="farm-manifest.json", help="results manifest (default: %(default)s)")
+    parser.add_argument("--refill-zones", action="store_true", help="refill the zones overlapping the generated tracks")
+    return parser
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = GetArgParser().parse_args(argv)
+    if not args.dry_run and not CanSaveBoard():
+        print(G_NO_SAVE_ERROR, file=sys.stderr)
+        return 2
+
+    boardList = ListBoards(args.boards)
+    if len(boardList) == 0:
+        print(f"error: no board matches {args.boards}", file=sys.stderr)
+        return 2
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    t0 = time.perf_counter()
+    resultList: List[dict] = []
+    workers = max(1, min(args.workers, len(boardList)))
+    # Threads only wait on the per-board worker processes
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futureList = []
+        for boardPath in boardList:
+            output = GetOutputPath(boardPath, args.output_dir, args.in_place)
+            futureList.append(pool.submit(RunFarmJobIsolated, boardPath, args.nets, args.selection_suffix, output, args.refill_zones))
+        resultList = [future.result() for future in futureList]
+    elapsed = time.perf_counter() - t0
+
+    count = {}
+    for ret in resultList:
+        count[ret["status"]] = count.get(ret["status"], 0) + 1
+        logger.info(f"{ret['board']}: {ret['status']} {ret['reason']}")
+
+    manifest = {"workers": workers, "elapsed": elapsed, "count": count, "boards": resultList}
+    with open(args.manifest, "w", encoding="UTF-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"{len(resultList)} boards in {elapsed:.3f}s {count} manifest {args.manifest}")
+    return 0 if count.get("ok", 0) == len(resultList) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
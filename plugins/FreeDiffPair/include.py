@@ -1,2 +1,68 @@
+import json
 import os
+from typing import List
+
+from .logger import getLogger
+
 G_PLUGIN_LOG_FILE = os.path.join(os.path.dirname(__file__), "./plugin.log")
+
+logger = getLogger("include")
+logger.addFileHandler(G_PLUGIN_LOG_FILE)
+
+# Optional settings next to the plugin, e.g. {"profile": true}, the environment overrides them
+G_PLUGIN_SETTINGS_FILE = os.path.join(os.path.dirname(__file__), "./settings.json")
+
+
+def _LoadSettings(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="UTF-8") as f:
+            ret = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return ret if isinstance(ret, dict) else {}
+
+
+G_PLUGIN_SETTINGS = _LoadSettings(G_PLUGIN_SETTINGS_FILE)
+
+
+def GetSetting(key: str, env: str, default: str) -> str:
+    if env in os.environ:
+        return os.environ[env]
+    if key in G_PLUGIN_SETTINGS:
+        return str(G_PLUGIN_SETTINGS[key])
+    return default
+
+
+# Fallbacks taken while reading the settings, main.py logs them again after it truncates plugin.log
+G_PLUGIN_SETTING_WARNINGS: List[str] = []
+
+
+def GetIntSetting(key: str, env: str, default: int) -> int:
+    # A malformed value must not stop the plugin from loading, fall back to the default
+    value = GetSetting(key, env, str(default))
+    try:
+        return int(value)
+    except ValueError:
+        msg = f"invalid integer {value!r} for {key}/{env}, using {default}"
+        G_PLUGIN_SETTING_WARNINGS.append(msg)
+        logger.warn(msg)
+        return default
+
+
+def IsTrue(value: str) -> bool:
+    return value.strip().lower() not in ("", "0", "false", "no", "off")
+
+
+# Opt-in: refill the zones overlapping the generated tracks at the end of a run
+G_PLUGIN_REFILL_ZONES = IsTrue(GetSetting("refillZones", "FREEDIFFPAIR_REFILL_ZONES", "0"))
+
+# Board backend: "pcbnew" (default, falls back to "memory" when pcbnew cannot be imported) or "memory"
+G_PLUGIN_BACKEND = GetSetting("backend", "FREEDIFFPAIR_BACKEND", "pcbnew").strip().lower()
+
+# Opt-in: run PluginMain under cProfile, write a .pstats file and a top-N report next to plugin.log
+G_PLUGIN_PROFILE = IsTrue(GetSetting("profile", "FREEDIFFPAIR_PROFILE", "0"))
+G_PLUGIN_PROFILE_TOP = GetIntSetting("profileTop", "FREEDIFFPAIR_PROFILE_TOP", 40)
+
+# Opt-in: tracemalloc accounting per PluginMain stage (peak/retained bytes and top allocation sites)
+G_PLUGIN_TRACEMALLOC = IsTrue(GetSetting("tracemalloc", "FREEDIFFPAIR_TRACEMALLOC", "0"))
+G_PLUGIN_TRACEMALLOC_TOP = GetIntSetting("tracemallocTop", "FREEDIFFPAIR_TRACEMALLOC_TOP", 5)
@@ -1,8 +1,31 @@
-from typing import Tuple  # noqa: F401
-import pcbnew
+from typing import Dict, Iterable, List, Set, Tuple  # noqa: F401
+from array import array
+import time
 
+from . import kiMemory
+from .include import G_PLUGIN_BACKEND
 from .mathLib import Vec2D
 
+# Board backend behind PY_PCB_TRACK and the make_* factories: the pcbnew SWIG module
+# inside KiCad, the pure Python kiMemory board when pcbnew is missing or not wanted
+try:
+    import pcbnew
+except ImportError:
+    pcbnew = kiMemory
+if G_PLUGIN_BACKEND == "memory":
+    pcbnew = kiMemory
+
+
+def GetBackend():
+    return pcbnew
+
+
+def SetBackend(module) -> None:
+    # module is pcbnew or kiMemory, boards and items of the previous backend must not be reused
+    global pcbnew
+    pcbnew = module
+
+
 kiUnit = 1000000
 
 
@@ -33,7 +56,9 @@ def X2KiINT(object) -> int:
 
 
 class PY_PCB_TRACK:
-    def __init__(self, obj: pcbnew.PCB_TRACK | Tuple[pcbnew.BOARD, Vec2D, Vec2D]) -> None:
+    def __init__(self, obj: pcbnew.PCB_TRACK | Tuple[pcbnew.BOARD, Vec2D, Vec2D] | None) -> None:
+        # None: the track only exists as a TrackTable row (e.g. read from a file by kiSexpr)
+        self.ki_pcb_track = None
         if isinstance(obj, pcbnew.PCB_TRACK):
             self.ki_pcb_track = obj
         elif isinstance(obj, tuple):
@@ -42,33 +67,59 @@ class PY_PCB_TRACK:
             xy2 = obj[2]
             self.ki_pcb_track = make_PCB_TRACK(board, pcbnew.F_Cu, xy1, xy2)
 
+        # Snapshot row in a TrackTable, reads are served from the table once bound
+        self._table: TrackTable | None = None
+        self._row: int = -1
         pass
 
-    def AddTo(self, board: pcbnew.BOARD):
+    def AddTo(self, board: "pcbnew.BOARD | PY_BOARD_COMMIT"):
         board.Add(self.ki_pcb_track)
 
     def GetStart(self) -> Vec2D:
+        if self._table is not None:
+            return Vec2D(self._table.sx[self._row], self._table.sy[self._row])
         ret: pcbnew.VECTOR2I = self.ki_pcb_track.GetStart()
         return Vec2D(ret.x, ret.y)
 
     def GetEnd(self) -> Vec2D:
+        if self._table is not None:
+            return Vec2D(self._table.ex[self._row], self._table.ey[self._row])
         ret: pcbnew.VECTOR2I = self.ki_pcb_track.GetEnd()
         return Vec2D(ret.x, ret.y)
 
     def SetStart(self, v: Vec2D) -> None:
-        self.ki_pcb_track.SetStart(XY2KiVECTOR2I(v))
+        if self.ki_pcb_track is not None:
+            self.ki_pcb_track.SetStart(XY2KiVECTOR2I(v))
+        if self._table is not None:
+            self._table.sx[self._row] = int(v.x)
+            self._table.sy[self._row] = int(v.y)
 
     def SetEnd(self, v: Vec2D) -> None:
-        self.ki_pcb_track.SetEnd(XY2KiVECTOR2I(v))
+        if self.ki_pcb_track is not None:
+            self.ki_pcb_track.SetEnd(XY2KiVECTOR2I(v))
+        if self._table is not None:
+            self._table.ex[self._row] = int(v.x)
+            self._table.ey[self._row] = int(v.y)
 
     def SetStartEnd(self, s: Vec2D, e: Vec2D) -> None:
-        self.ki_pcb_track.SetStartEnd(XY2KiVECTOR2I(s), XY2KiVECTOR2I(s))
+        if self.ki_pcb_track is not None:
+            self.ki_pcb_track.SetStartEnd(XY2KiVECTOR2I(s), XY2KiVECTOR2I(e))
+        if self._table is not None:
+            self._table.sx[self._row] = int(s.x)
+            self._table.sy[self._row] = int(s.y)
+            self._table.ex[self._row] = int(e.x)
+            self._table.ey[self._row] = int(e.y)
 
     def GetWidth(self) -> int:
+        if self._table is not None:
+            return self._table.width[self._row]
         return self.ki_pcb_track.GetWidth()
 
     def setWidth(self, v):
-        self.ki_pcb_track.SetWidth(X2KiINT(v))
+        if self.ki_pcb_track is not None:
+            self.ki_pcb_track.SetWidth(X2KiINT(v))
+        if self._table is not None:
+            self._table.width[self._row] = X2KiINT(v)
 
     def GetLength(self) -> int:
         return self.ki_pcb_track.GetLength()
@@ -77,13 +128,25 @@ class PY_PCB_TRACK:
         return self.ki_pcb_track.ApproxCollinear(t.ki_pcb_track)
 
     def GetLayer(self) -> int:
+        if self._table is not None:
+            return self._table.layer[self._row]
         return self.ki_pcb_track.GetLayer()
 
     def GetLayerName(self):
+        if self.ki_pcb_track is None:
+            return self._table.layerNames.get(self.GetLayer(), str(self.GetLayer()))
         return self.ki_pcb_track.GetLayerName()
 
     def SetLayer(self, layer: int) -> int:
-        return self.ki_pcb_track.SetLayer(layer)
+        if self._table is not None:
+            self._table.layer[self._row] = layer
+        if self.ki_pcb_track is not None:
+            return self.ki_pcb_track.SetLayer(layer)
+
+    def GetNetCode(self) -> int:
+        if self._table is not None:
+            return self._table.netcode[self._row]
+        return self.ki_pcb_track.GetNetCode()
 
     def __str__(self) -> str:
         return (
@@ -96,6 +159,297 @@ class PY_PCB_TRACK:
         )
 
 
+class PY_BOARD_COMMIT:
+    """All additions and modifications of one plugin run, applied to the board by a single Push."""
+
+    # pcbnew.BOARD_COMMIT needs the editor's tool manager and cannot be created from a plugin.
+    # The single undo step comes from the action plugin runner, which snapshots the board
+    # around Run(). Additions are queued until Push. Modify records the original endpoints,
+    # so Revert can restore the board when a run fails before Push.
+    def __init__(self, board: pcbnew.BOARD) -> None:
+        self.board = board
+        self._addList: List[pcbnew.BOARD_ITEM] = []
+        self._modifyList: List[pcbnew.BOARD_ITEM] = []
+        self._pushedList: List[pcbnew.BOARD_ITEM] = []
+        # id() of every queued item, they are kept alive by the lists above
+        self._idSet: Set[int] = set()
+        # (start x, y, end x, y) of every modified item, None for items without endpoints
+        self._originList: List[Tuple[int, int, int, int] | None] = []
+
+    def Add(self, item):
+        kobj = getattr(item, "ki_pcb_track", item)
+        self._addList.append(kobj)
+        self._idSet.add(id(kobj))
+
+    # Must be called before the item is changed
+    def Modify(self, item):
+        kobj = getattr(item, "ki_pcb_track", item)
+        # Items added by this commit are stored in their final state anyway
+        if id(kobj) in self._idSet:
+            return
+        self._modifyList.append(kobj)
+        self._idSet.add(id(kobj))
+        origin = None
+        if hasattr(kobj, "GetStart") and hasattr(kobj, "GetEnd"):
+            ptStart, ptEnd = kobj.GetStart(), kobj.GetEnd()
+            origin = (ptStart.x, ptStart.y, ptEnd.x, ptEnd.y)
+        self._originList.append(origin)
+
+    def Revert(self):
+        # Restore the modified items and drop the queued additions, returns the number restored
+        restored = 0
+        for kobj, origin in zip(self._modifyList, self._originList):
+            if origin is None:
+                continue
+            kobj.SetStart(pcbnew.VECTOR2I(origin[0], origin[1]))
+            kobj.SetEnd(pcbnew.VECTOR2I(origin[2], origin[3]))
+            restored += 1
+        self._Clear()
+        return restored
+
+    def _Clear(self):
+        self._addList = []
+        self._modifyList = []
+        self._idSet = set()
+        self._originList = []
+
+    def _UpdateConnectivity(self, netcodes: List[int]):
+        # board.Add already registers the added items, only the modified ones are updated.
+        # One item per touched net marks that net dirty, RecalculateRatsnest then rebuilds
+        # the dirty nets instead of a full BuildConnectivity of the board
+        getConnectivity = getattr(self.board, "GetConnectivity", None)
+        if getConnectivity is None or len(netcodes) == 0:
+            return
+        conn = getConnectivity()
+        for kobj in self._modifyList:
+            conn.Update(kobj)
+        markDirty = getattr(conn, "MarkItemNetAsDirty", None)
+        if markDirty is not None:
+            netItem = {}
+            for kobj in [*self._addList, *self._modifyList]:
+                if hasattr(kobj, "GetNetCode"):
+                    netItem.setdefault(kobj.GetNetCode(), kobj)
+            for net in netcodes:
+                if net in netItem:
+                    markDirty(netItem[net])
+        conn.RecalculateRatsnest()
+
+    def GetNetCodes(self):
+        return sorted({kobj.GetNetCode() for kobj in [*self._addList, *self._modifyList] if hasattr(kobj, "GetNetCode")})
+
+    # Items added or modified by the last Push
+    def GetPushedList(self):
+        return self._pushedList
+
+    def GetAddList(self):
+        return self._addList
+
+    def GetModifyList(self):
+        return self._modifyList
+
+    def Push(self, message: str):
+        netcodes = self.GetNetCodes()
+        self._pushedList = [*self._addList, *self._modifyList]
+        for kobj in self._addList:
+            self.board.Add(kobj)
+        self._UpdateConnectivity(netcodes)
+        added, modified = len(self._addList), len(self._modifyList)
+        self._Clear()
+        return added, modified, netcodes
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__} 0x{id(self):X} add:{len(self._addList)} modify:{len(self._modifyList)}>"
+
+
+class TrackTable:
+    """Columnar snapshot of the selected tracks, each track is read through SWIG exactly once."""
+
+    def __init__(self, tracks: List[PY_PCB_TRACK]) -> None:
+        self.tracks: List[PY_PCB_TRACK] = tracks
+        self.sx = array("q")
+        self.sy = array("q")
+        self.ex = array("q")
+        self.ey = array("q")
+        self.width = array("q")
+        self.layer = array("q")
+        self.netcode = array("q")
+        # Layer id to name, only used when the tracks have no pcbnew object
+        self.layerNames: Dict[int, str] = {}
+
+        for i, track in enumerate(tracks):
+            kobj = track.ki_pcb_track
+            ptStart: pcbnew.VECTOR2I = kobj.GetStart()
+            ptEnd: pcbnew.VECTOR2I = kobj.GetEnd()
+            self.sx.append(ptStart.x)
+            self.sy.append(ptStart.y)
+            self.ex.append(ptEnd.x)
+            self.ey.append(ptEnd.y)
+            self.width.append(kobj.GetWidth())
+            self.layer.append(kobj.GetLayer())
+            self.netcode.append(kobj.GetNetCode())
+            # Later reads of the track go to this table
+            track._table = self
+            track._row = i
+
+    def Subset(self, rows: List[int]) -> "TrackTable":
+        # Copy the given rows into a new table without touching pcbnew again
+        sub = TrackTable([])
+        sub.layerNames = self.layerNames
+        for i in rows:
+            sub.AppendRow(self.tracks[i], self.sx[i], self.sy[i], self.ex[i], self.ey[i], self.width[i], self.layer[i], self.netcode[i])
+        return sub
+
+    def AppendRow(self, track: PY_PCB_TRACK, sx: int, sy: int, ex: int, ey: int, width: int, layer: int, netcode: int):
+        self.tracks.append(track)
+        self.sx.append(sx)
+        self.sy.append(sy)
+        self.ex.append(ex)
+        self.ey.append(ey)
+        self.width.append(width)
+        self.layer.append(layer)
+        self.netcode.append(netcode)
+        track._table = self
+        track._row = len(self.tracks) - 1
+
+    @staticmethod
+    def From(obj: "TrackTable | List[PY_PCB_TRACK]") -> "TrackTable":
+        if isinstance(obj, TrackTable):
+            return obj
+        return TrackTable(obj)
+
+    def Count(self):
+        return len(self.tracks)
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__} 0x{id(self):X} track:{self.Count()}>"
+
+
+def IsTrackSegment(item) -> bool:
+    # Vias and arcs are PCB_TRACK subclasses but not straight segments
+    if not isinstance(item, pcbnew.PCB_TRACK):
+        return False
+    return not isinstance(item, (pcbnew.PCB_VIA, pcbnew.PCB_ARC))
+
+
+class TrackSelection_Result:
+    def __init__(self, tracks: List[PY_PCB_TRACK], source: str, scanned: int, elapsed: float) -> None:
+        self.tracks: List[PY_PCB_TRACK] = tracks
+        self.source: str = source
+        self.scanned: int = scanned
+        self.elapsed: float = elapsed
+
+
+def GetSelectedTracks(
+    board: pcbnew.BOARD,
+    netcodes: Iterable[int] | None = None,
+    selectedOnly: bool = True,
+) -> TrackSelection_Result:
+    # Prefer the smallest candidate set: tracks of the given nets, the editor selection,
+    # and only then every track on the board. Non-segment items are skipped.
+    t0 = time.perf_counter()
+
+    def scan(items, source: str, selectedOnly: bool):
+        ret: List[PY_PCB_TRACK] = []
+        scanned = 0
+        for item in items:
+            scanned += 1
+            item = item.Cast() if hasattr(item, "Cast") else item
+            if not IsTrackSegment(item):
+                continue
+            if selectedOnly and not item.IsSelected():
+                continue
+            ret.append(PY_PCB_TRACK(item))
+        return TrackSelection_Result(ret, source, scanned, time.perf_counter() - t0)
+
+    if netcodes is not None:
+        items = [item for net in netcodes for item in board.TracksInNet(net)]
+        return scan(items, "net", selectedOnly)
+
+    getSelection = getattr(pcbnew, "GetCurrentSelection", None)
+    if selectedOnly and getSelection is not None:
+        ret = scan(getSelection(), "selection", False)
+        if len(ret.tracks) != 0:
+            return ret
+
+    return scan(board.GetTracks(), "board", selectedOnly)
+
+
+def GetTrackBoundingBoxes(items) -> Dict[int, pcbnew.BOX2I]:
+    # Bounding box of the given tracks (including half width) per copper layer
+    bound: Dict[int, List[int]] = {}
+    for kobj in items:
+        if not isinstance(kobj, pcbnew.PCB_TRACK):
+            continue
+        ptStart: pcbnew.VECTOR2I = kobj.GetStart()
+        ptEnd: pcbnew.VECTOR2I = kobj.GetEnd()
+        half = kobj.GetWidth() // 2
+        x1, x2 = min(ptStart.x, ptEnd.x) - half, max(ptStart.x, ptEnd.x) + half
+        y1, y2 = min(ptStart.y, ptEnd.y) - half, max(ptStart.y, ptEnd.y) + half
+        box = bound.get(kobj.GetLayer())
+        if box is None:
+            bound[kobj.GetLayer()] = [x1, y1, x2, y2]
+            continue
+        box[0], box[1] = min(box[0], x1), min(box[1], y1)
+        box[2], box[3] = max(box[2], x2), max(box[3], y2)
+    return {layer: pcbnew.BOX2I(pcbnew.VECTOR2I(x1, y1), pcbnew.VECTOR2I(x2 - x1, y2 - y1)) for layer, (x1, y1, x2, y2) in bound.items()}
+
+
+class ZoneRefill_Result:
+    def __init__(self, zones: int, checked: int, elapsed: float) -> None:
+        self.zones: int = zones
+        self.checked: int = checked
+        self.elapsed: float = elapsed
+
+
+def GetClearanceMargin(board: pcbnew.BOARD) -> int:
+    # Largest clearance of the design rules, a track this close to a zone changes its fill
+    getDesignSettings = getattr(board, "GetDesignSettings", None)
+    if getDesignSettings is None:
+        return 0
+    getBiggest = getattr(getDesignSettings(), "GetBiggestClearanceValue", None)
+    return int(getBiggest()) if getBiggest is not None else 0
+
+
+def TrackHitsZoneOutline(zone, kobj, margin: int = 0) -> bool:
+    # Collision of the track segment (half width + margin) with the zone outline,
+    # true when the outline cannot be tested so the caller keeps the bounding box result
+    getOutline = getattr(zone, "Outline", None)
+    SEG = getattr(pcbnew, "SEG", None)
+    if getOutline is None or SEG is None:
+        return True
+    return bool(getOutline().Collide(SEG(kobj.GetStart(), kobj.GetEnd()), kobj.GetWidth() // 2 + margin))
+
+
+def RefillZonesInBox(board: pcbnew.BOARD, boxes: Dict[int, pcbnew.BOX2I], items=None) -> ZoneRefill_Result:
+    # Refill only the zones on the layers of the boxes whose outline bounding box intersects them,
+    # with items given the zone outline must also collide with one of the tracks on that layer
+    t0 = time.perf_counter()
+    layerTracks: Dict[int, List[pcbnew.PCB_TRACK]] = {}
+    for kobj in items if items is not None else []:
+        if isinstance(kobj, pcbnew.PCB_TRACK):
+            layerTracks.setdefault(kobj.GetLayer(), []).append(kobj)
+    margin = GetClearanceMargin(board) if items is not None else 0
+
+    zones = []
+    checked = 0
+    for zone in board.Zones():
+        checked += 1
+        zbox: pcbnew.BOX2I = zone.GetBoundingBox()
+        for layer, box in boxes.items():
+            if not zone.IsOnLayer(layer) or not zbox.Intersects(box):
+                continue
+            if items is not None and not any(TrackHitsZoneOutline(zone, kobj, margin) for kobj in layerTracks.get(layer, [])):
+                continue
+            zones.append(zone)
+            break
+    if len(zones) != 0:
+        pcbnew.ZONE_FILLER(board).Fill(zones)
+    return ZoneRefill_Result(len(zones), checked, time.perf_counter() - t0)
+
+
 def make_PCB_DIM_CENTER(
     parent: pcbnew.BOARD,
     layer,
@@ -161,7 +515,7 @@ def make_PCB_TRACK(
     kobj.SetNetCode(netcode)
     kobj.SetLayer(aLayer=layer)
     kobj.SetWidth(thickness)
-    kobj.SetStart(XY2KiVECTOR2I(xy1))
-    kobj.SetEnd(XY2KiVECTOR2I(xy2))
-    kobj.Rotate(XY2KiVECTOR2I(xy1), pcbnew.EDA_ANGLE(float(angles)))
+    kobj.SetStartEnd(XY2KiVECTOR2I(xy1), XY2KiVECTOR2I(xy2))
+    if angles != 0:
+        kobj.Rotate(XY2KiVECTOR2I(xy1), pcbnew.EDA_ANGLE(float(angles)))
     return kobj
@@ -0,0 +1,497 @@
+from typing import Dict, List  # noqa: F401
+import math
+import uuid
+
+# Pure Python in-memory board with the subset of the pcbnew API used by this plugin
+#
+# kiLib selects it when pcbnew cannot be imported (or with FREEDIFFPAIR_BACKEND=memory),
+# so PluginMain and the solver pipeline run without KiCad, e.g. for benchmarks and
+# large synthetic workloads. Names follow pcbnew so the module is a drop-in backend.
+# Layer ids follow KiCad 8 (F_Cu=0, In1_Cu..In30_Cu=1..30, B_Cu=31).
+
+F_Cu = 0
+B_Cu = 31
+B_Adhes = 32
+F_Adhes = 33
+B_Paste = 34
+F_Paste = 35
+B_SilkS = 36
+F_SilkS = 37
+B_Mask = 38
+F_Mask = 39
+Edge_Cuts = 44
+B_CrtYd = 46
+F_CrtYd = 47
+B_Fab = 48
+F_Fab = 49
+
+SHAPE_T_SEGMENT = 0
+SHAPE_T_RECT = 1
+SHAPE_T_ARC = 2
+SHAPE_T_CIRCLE = 3
+
+_BACK_LAYERS = {B_Cu, B_Adhes, B_Paste, B_SilkS, B_Mask, B_CrtYd, B_Fab}
+_LAYER_NAMES = {
+    F_Cu: "F.Cu",
+    B_Cu: "B.Cu",
+    B_Adhes: "B.Adhes",
+    F_Adhes: "F.Adhes",
+    B_Paste: "B.Paste",
+    F_Paste: "F.Paste",
+    B_SilkS: "B.Silkscreen",
+    F_SilkS: "F.Silkscreen",
+    B_Mask: "B.Mask",
+    F_Mask: "F.Mask",
+    Edge_Cuts: "Edge.Cuts",
+    B_CrtYd: "B.Courtyard",
+    F_CrtYd: "F.Courtyard",
+    B_Fab: "B.Fab",
+    F_Fab: "F.Fab",
+    **{i: f"In{i}.Cu" for i in range(1, 31)},
+}
+
+
+def IsBackLayer(layer: int) -> bool:
+    return layer in _BACK_LAYERS
+
+
+def KiROUND(v: float) -> int:
+    # Round half away from zero like KiCad
+    return int(math.floor(v + 0.5)) if v >= 0 else -int(math.floor(-v + 0.5))
+
+
+class VECTOR2I:
+    __slots__ = ("x", "y")
+
+    def __init__(self, x: int = 0, y: int = 0) -> None:
+        self.x = int(x)
+        self.y = int(y)
+
+    def __eq__(self, o) -> bool:
+        return isinstance(o, VECTOR2I) and self.x == o.x and self.y == o.y
+
+    def __repr__(self) -> str:
+        return f"VECTOR2I({self.x}, {self.y})"
+
+
+class EDA_ANGLE:
+    def __init__(self, degrees: float = 0.0) -> None:
+        self.degrees = float(degrees)
+
+    def AsDegrees(self) -> float:
+        return self.degrees
+
+    def AsRadians(self) -> float:
+        return math.radians(self.degrees)
+
+
+def RotatePoint(pt: VECTOR2I, center: VECTOR2I, angle: EDA_ANGLE) -> VECTOR2I:
+    # Same convention as KiCad, positive angles turn counterclockwise on screen (Y down)
+    deg = angle.AsDegrees() % 360.0
+    x, y = pt.x - center.x, pt.y - center.y
+    if deg == 0.0:
+        pass
+    elif deg == 90.0:
+        x, y = y, -x
+    elif deg == 180.0:
+        x, y = -x, -y
+    elif deg == 270.0:
+        x, y = -y, x
+    else:
+        s, c = math.sin(math.radians(deg)), math.cos(math.radians(deg))
+        x, y = KiROUND(y * s + x * c), KiROUND(y * c - x * s)
+    return VECTOR2I(x + center.x, y + center.y)
+
+
+class BOX2I:
+    def __init__(self, pos: VECTOR2I | None = None, size: VECTOR2I | None = None) -> None:
+        self.pos = pos if pos is not None else VECTOR2I()
+        self.size = size if size is not None else VECTOR2I()
+
+    def GetPosition(self):
+        return VECTOR2I(self.pos.x, self.pos.y)
+
+    def GetSize(self):
+        return VECTOR2I(self.size.x, self.size.y)
+
+    def GetLeft(self):
+        return min(self.pos.x, self.pos.x + self.size.x)
+
+    def GetRight(self):
+        return max(self.pos.x, self.pos.x + self.size.x)
+
+    def GetTop(self):
+        return min(self.pos.y, self.pos.y + self.size.y)
+
+    def GetBottom(self):
+        return max(self.pos.y, self.pos.y + self.size.y)
+
+    def Intersects(self, o: "BOX2I") -> bool:
+        return not (o.GetLeft() > self.GetRight() or o.GetRight() < self.GetLeft() or o.GetTop() > self.GetBottom() or o.GetBottom() < self.GetTop())
+
+
+class KIID:
+    def __init__(self, s: str | None = None) -> None:
+        self._s = s if s is not None else str(uuid.uuid4())
+
+    def AsString(self) -> str:
+        return self._s
+
+
+class NETINFO_ITEM:
+    def __init__(self, netcode: int, name: str) -> None:
+        self._netcode = netcode
+        self._name = name
+
+    def GetNetCode(self) -> int:
+        return self._netcode
+
+    def GetNetname(self) -> str:
+        return self._name
+
+
+class BOARD_ITEM:
+    def __init__(self, parent: "BOARD | None" = None) -> None:
+        self._parent = parent
+        self._layer = F_Cu
+        self._selected = False
+        self.m_Uuid = KIID()
+
+    def GetParent(self):
+        return self._parent
+
+    def SetParent(self, parent: "BOARD | None"):
+        self._parent = parent
+
+    def GetBoard(self):
+        return self._parent
+
+    def SetLayer(self, aLayer: int):
+        self._layer = aLayer
+
+    def GetLayer(self) -> int:
+        return self._layer
+
+    def IsOnLayer(self, layer: int) -> bool:
+        return self._layer == layer
+
+    def GetLayerName(self) -> str:
+        if self._parent is not None:
+            return self._parent.GetLayerName(self._layer)
+        return _LAYER_NAMES.get(self._layer, str(self._layer))
+
+    def IsSelected(self) -> bool:
+        return self._selected
+
+    def SetSelected(self):
+        self._selected = True
+
+    def ClearSelected(self):
+        self._selected = False
+
+    def Cast(self):
+        return self
+
+
+class PCB_TRACK(BOARD_ITEM):
+    def __init__(self, parent: "BOARD | None" = None) -> None:
+        super().__init__(parent)
+        self._start = VECTOR2I()
+        self._end = VECTOR2I()
+        self._width = 0
+        self._netcode = 0
+
+    def GetClass(self) -> str:
+        return "PCB_TRACK"
+
+    def SetNetCode(self, netcode: int):
+        self._netcode = int(netcode)
+
+    def GetNetCode(self) -> int:
+        return self._netcode
+
+    def GetNetname(self) -> str:
+        if self._parent is not None:
+            net = self._parent.FindNet(self._netcode)
+            if net is not None:
+                return net.GetNetname()
+        return ""
+
+    def SetWidth(self, width: int):
+        self._width = int(width)
+
+    def GetWidth(self) -> int:
+        return self._width
+
+    def SetStart(self, aPoint: VECTOR2I):
+        self._start = VECTOR2I(aPoint.x, aPoint.y)
+
+    def SetEnd(self, aPoint: VECTOR2I):
+        self._end = VECTOR2I(aPoint.x, aPoint.y)
+
+    def SetStartEnd(self, aStart: VECTOR2I, aEnd: VECTOR2I):
+        self.SetStart(aStart)
+        self.SetEnd(aEnd)
+
+    def GetStart(self) -> VECTOR2I:
+        return VECTOR2I(self._start.x, self._start.y)
+
+    def GetEnd(self) -> VECTOR2I:
+        return VECTOR2I(self._end.x, self._end.y)
+
+    def GetLength(self) -> float:
+        return math.hypot(self._end.x - self._start.x, self._end.y - self._start.y)
+
+    def ApproxCollinear(self, t: "PCB_TRACK") -> bool:
+        # SEG::ApproxCollinear, both ends of t within one unit of this line
+        p = self._start.y - self._end.y
+        q = self._end.x - self._start.x
+        r = -p * self._start.x - q * self._start.y
+        d = math.hypot(p, q)
+        if d == 0:
+            return False
+        d1 = (p * t._start.x + q * t._start.y + r) / d
+        d2 = (p * t._end.x + q * t._end.y + r) / d
+        return abs(d1) <= 1 and abs(d2) <= 1
+
+    def Rotate(self, aRotCentre: VECTOR2I, aAngle: EDA_ANGLE):
+        self._start = RotatePoint(self._start, aRotCentre, aAngle)
+        self._end = RotatePoint(self._end, aRotCentre, aAngle)
+
+    def GetBoundingBox(self) -> BOX2I:
+        half = self._width // 2
+        x1, x2 = min(self._start.x, self._end.x) - half, max(self._start.x, self._end.x) + half
+        y1, y2 = min(self._start.y, self._end.y) - half, max(self._start.y, self._end.y) + half
+        return BOX2I(VECTOR2I(x1, y1), VECTOR2I(x2 - x1, y2 - y1))
+
+
+class PCB_ARC(PCB_TRACK):
+    def __init__(self, parent: "BOARD | None" = None) -> None:
+        super().__init__(parent)
+        self._mid = VECTOR2I()
+
+    def GetClass(self) -> str:
+        return "PCB_ARC"
+
+    def SetMid(self, aMid: VECTOR2I):
+        self._mid = VECTOR2I(aMid.x, aMid.y)
+
+    def GetMid(self) -> VECTOR2I:
+        return VECTOR2I(self._mid.x, self._mid.y)
+
+
+class PCB_VIA(PCB_TRACK):
+    def __init__(self, parent: "BOARD | None" = None) -> None:
+        super().__init__(parent)
+        self._drill = 0
+
+    def GetClass(self) -> str:
+        return "PCB_VIA"
+
+    def SetPosition(self, aPoint: VECTOR2I):
+        self.SetStartEnd(aPoint, aPoint)
+
+    def GetPosition(self) -> VECTOR2I:
+        return self.GetStart()
+
+    def SetDrill(self, drill: int):
+        self._drill = int(drill)
+
+    def GetDrill(self) -> int:
+        return self._drill
+
+
+class PCB_SHAPE(BOARD_ITEM):
+    def __init__(self, parent: "BOARD | None" = None) -> None:
+        super().__init__(parent)
+        self._shape = SHAPE_T_SEGMENT
+        self._start = VECTOR2I()
+        self._end = VECTOR2I()
+        self._width = 0
+        self._filled = False
+
+    def GetClass(self) -> str:
+        return "PCB_SHAPE"
+
+    def SetShape(self, shape: int):
+        self._shape = shape
+
+    def GetShape(self) -> int:
+        return self._shape
+
+    def SetFilled(self, filled: bool):
+        self._filled = bool(filled)
+
+    def IsFilled(self) -> bool:
+        return self._filled
+
+    def SetWidth(self, width: int):
+        self._width = int(width)
+
+    def GetWidth(self) -> int:
+        return self._width
+
+    def SetStart(self, aPoint: VECTOR2I):
+        self._start = VECTOR2I(aPoint.x, aPoint.y)
+
+    def SetEnd(self, aPoint: VECTOR2I):
+        self._end = VECTOR2I(aPoint.x, aPoint.y)
+
+    def GetStart(self) -> VECTOR2I:
+        return VECTOR2I(self._start.x, self._start.y)
+
+    def GetEnd(self) -> VECTOR2I:
+        return VECTOR2I(self._end.x, self._end.y)
+
+    # Circles keep the center in start and a point of the circle in end, as pcbnew does
+    def SetCenter(self, aCenter: VECTOR2I):
+        self.SetStart(aCenter)
+
+    def GetCenter(self) -> VECTOR2I:
+        return self.GetStart()
+
+    def SetRadius(self, radius: int):
+        self._end = VECTOR2I(self._start.x + int(radius), self._start.y)
+
+    def GetRadius(self) -> int:
+        return KiROUND(math.hypot(self._end.x - self._start.x, self._end.y - self._start.y))
+
+    def Rotate(self, aRotCentre: VECTOR2I, aAngle: EDA_ANGLE):
+        self._start = RotatePoint(self._start, aRotCentre, aAngle)
+        self._end = RotatePoint(self._end, aRotCentre, aAngle)
+
+
+class PCB_DIM_CENTER(PCB_SHAPE):
+    def __init__(self, parent: "BOARD | None" = None) -> None:
+        super().__init__(parent)
+        self._mirrored = False
+
+    def GetClass(self) -> str:
+        return "PCB_DIM_CENTER"
+
+    def SetMirrored(self, mirrored: bool):
+        self._mirrored = bool(mirrored)
+
+    def IsMirrored(self) -> bool:
+        return self._mirrored
+
+    def SetLineThickness(self, width: int):
+        self.SetWidth(width)
+
+    def GetLineThickness(self) -> int:
+        return self.GetWidth()
+
+
+class BOARD:
+    def __init__(self) -> None:
+        self._tracks: List[PCB_TRACK] = []
+        self._drawings: List[BOARD_ITEM] = []
+        self._nets: Dict[int, NETINFO_ITEM] = {0: NETINFO_ITEM(0, "")}
+        self._netByName: Dict[str, NETINFO_ITEM] = {"": self._nets[0]}
+        self._layerNames: Dict[int, str] = dict(_LAYER_NAMES)
+        self._fileName = ""
+
+    def GetFileName(self) -> str:
+        return self._fileName
+
+    def Add(self, item: BOARD_ITEM):
+        item.SetParent(self)
+        if isinstance(item, PCB_TRACK):
+            self._tracks.append(item)
+        else:
+            self._drawings.append(item)
+
+    def Remove(self, item: BOARD_ITEM):
+        items = self._tracks if isinstance(item, PCB_TRACK) else self._drawings
+        for i, obj in enumerate(items):
+            if obj is item:
+                del items[i]
+                item.SetParent(None)
+                return
+
+    def GetTracks(self) -> List[PCB_TRACK]:
+        return list(self._tracks)
+
+    def TracksInNet(self, netcode: int) -> List[PCB_TRACK]:
+        return [t for t in self._tracks if t.GetNetCode() == netcode]
+
+    def GetDrawings(self) -> List[BOARD_ITEM]:
+        return list(self._drawings)
+
+    def Zones(self) -> list:
+        return []
+
+    def AddNet(self, netcode: int, name: str) -> NETINFO_ITEM:
+        net = NETINFO_ITEM(netcode, name)
+        self._nets[netcode] = net
+        self._netByName[name] = net
+        return net
+
+    def FindNet(self, key: int | str) -> NETINFO_ITEM | None:
+        if isinstance(key, str):
+            return self._netByName.get(key)
+        return self._nets.get(key)
+
+    def GetNetCount(self) -> int:
+        return len(self._nets)
+
+    def SetLayerName(self, layer: int, name: str):
+        self._layerNames[layer] = name
+
+    def GetLayerName(self, layer: int) -> str:
+        return self._layerNames.get(layer, str(layer))
+
+    def GetLayerID(self, name: str) -> int:
+        for layer, n in self._layerNames.items():
+            if n == name:
+                return layer
+        return -1
+
+
+class ZONE_FILLER:
+    # The in-memory board has no zones
+    def __init__(self, board: BOARD) -> None:
+        self.board = board
+
+    def Fill(self, zones, check: bool = False) -> bool:
+        return True
+
+
+def LoadBoard(path: str) -> BOARD:
+    # Tracks, vias and nets of a .kicad_pcb file, read without pcbnew
+    from .kiSexpr import ReadBoardFile
+
+    pcb = ReadBoardFile(path)
+    board = BOARD()
+    board._fileName = path
+    for name, layer in pcb.layers.items():
+        board.SetLayerName(layer, name)
+    for netcode, name in pcb.nets.items():
+        board.AddNet(netcode, name)
+
+    def add(track: PCB_TRACK, cols, i: int):
+        track.SetStartEnd(VECTOR2I(cols.sx[i], cols.sy[i]), VECTOR2I(cols.ex[i], cols.ey[i]))
+        track.SetWidth(cols.width[i])
+        track.SetLayer(cols.layer[i])
+        track.SetNetCode(cols.netcode[i])
+        if cols.uuid[i] != "":
+            track.m_Uuid = KIID(cols.uuid[i])
+        board.Add(track)
+        return track
+
+    for i in range(pcb.segments.Count()):
+        add(PCB_TRACK(board), pcb.segments, i)
+    for i in range(pcb.arcs.Count()):
+        add(PCB_ARC(board), pcb.arcs, i).SetMid(VECTOR2I(pcb.arcs.mx[i], pcb.arcs.my[i]))
+    vias = pcb.vias
+    for i in range(vias.Count()):
+        via = PCB_VIA(board)
+        via.SetPosition(VECTOR2I(vias.x[i], vias.y[i]))
+        via.SetWidth(vias.size[i])
+        via.SetDrill(vias.drill[i])
+        via.SetLayer(F_Cu)
+        via.SetNetCode(vias.netcode[i])
+        if vias.uuid[i] != "":
+            via.m_Uuid = KIID(vias.uuid[i])
+        board.Add(via)
+    return board
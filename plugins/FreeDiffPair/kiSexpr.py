@@ -0,0 +1,323 @@
+from typing import Dict, Iterator, List, Tuple  # noqa: F401
+from array import array
+import mmap
+import re
+import time
+
+# Streaming reader for the track records of a .kicad_pcb file, does not need pcbnew
+#
+# The file is memory-mapped and scanned once. Only the top level
+# (segment ...), (arc ...), (via ...), (net ...) and (layers ...) records are
+# tokenized, every other subtree (footprints, zones, drawings) is skipped by
+# counting parentheses without building it.
+
+G_READ_HEADS = (b"segment", b"arc", b"via", b"net", b"layers")
+
+_RE_SKIP = re.compile(rb'[()"]')
+_RE_STRING_END = re.compile(rb'(?:[^"\\]|\\.)*"', re.S)
+_RE_HEAD = re.compile(rb'\(\s*([^\s()"]+)')
+_RE_TOKEN = re.compile(rb'(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+)', re.S)
+
+
+def _BalancedPattern(depth: int) -> bytes:
+    # Regex for an expression nested at most depth levels, lets re skip whole subtrees in C
+    # Every alternative starts with a different character, so failing matches do not backtrack
+    string = rb'"(?:[^"\\]|\\.)*"'
+    pattern = rb'\((?:[^()"]|' + string + rb')*\)'
+    for i in range(depth - 1):
+        pattern = rb'\((?:[^()"]|' + string + rb'|' + pattern + rb')*\)'
+    return pattern
+
+
+_RE_BALANCED = re.compile(_BalancedPattern(8), re.S)
+
+# Canonical one record form written by pcbnew, anything else goes through ParseTree
+_NUM = rb'([-+0-9.eE]+)'
+_RE_SEGMENT = re.compile(
+    rb'\(segment\s+\(start\s+' + _NUM + rb'\s+' + _NUM + rb'\)\s*\(end\s+' + _NUM + rb'\s+' + _NUM
+    + rb'\)\s*\(width\s+' + _NUM + rb'\)\s*\(layer\s+"?([^\s()"]+)"?\)\s*\(net\s+([^\s()"]+|"(?:[^"\\]|\\.)*")\)'
+    + rb'\s*\((?:uuid|tstamp)\s+"?([^\s()"]+)"?\)\s*\)'
+)
+
+
+def ToKiUnit(tok: str | bytes) -> int:
+    # File coordinates are mm, pcbnew uses nm
+    return int(round(float(tok) * 1000000))
+
+
+def _Unescape(raw: bytes) -> str:
+    s = raw.decode("UTF-8")
+    if "\\" in s:
+        s = re.sub(r"\\(.)", r"\1", s)
+    return s
+
+
+def _SkipString(buf, pos: int) -> int:
+    # pos is just after the opening quote, returns the position after the closing one
+    m = _RE_STRING_END.match(buf, pos)
+    assert m is not None, f"Failure (unterminated string at {pos})"
+    return m.end()
+
+
+def _FindClose(buf, start: int) -> int:
+    # start is an opening parenthesis, returns the position after the matching one
+    m = _RE_BALANCED.match(buf, start)
+    if m is not None:
+        return m.end()
+    # Deeper than the regex, count the parentheses
+    depth = 1
+    pos = start + 1
+    search = _RE_SKIP.search
+    while True:
+        m = search(buf, pos)
+        assert m is not None, f"Failure (unbalanced expression at {start})"
+        c = buf[m.start()]
+        pos = m.end()
+        if c == 0x28:  # (
+            depth += 1
+        elif c == 0x29:  # )
+            depth -= 1
+            if depth == 0:
+                return pos
+        else:
+            pos = _SkipString(buf, pos)
+
+
+def ParseTree(data: bytes) -> list:
+    # Build nested lists from one complete expression, atoms and strings become str
+    stack: List[list] = [[]]
+    for lp, rp, string, atom in _RE_TOKEN.findall(data):
+        if lp:
+            stack.append([])
+        elif rp:
+            node = stack.pop()
+            stack[-1].append(node)
+        elif atom:
+            stack[-1].append(atom.decode("UTF-8"))
+        else:
+            stack[-1].append(_Unescape(string))
+    assert len(stack) == 1 and len(stack[0]) == 1, "Failure (malformed expression)"
+    return stack[0][0]
+
+
+def IterRecords(buf, heads: Tuple[bytes, ...] = G_READ_HEADS, fast: Dict[bytes, re.Pattern] | None = None) -> Iterator[Tuple[bytes, int, int, re.Match | None]]:
+    # Yield (head, start, end, match) of the top level records of the board whose head is in heads
+    # A record matched completely by its fast pattern is yielded with the match, and is not re-scanned
+    fast = fast if fast is not None else {}
+    m = _RE_SKIP.search(buf, 0)
+    assert m is not None and buf[m.start()] == 0x28, "Failure (not an s-expression file)"
+    pos = m.end()
+    search = _RE_SKIP.search
+    headMatch = _RE_HEAD.match
+    while True:
+        m = search(buf, pos)
+        if m is None:
+            return
+        start = m.start()
+        c = buf[start]
+        if c == 0x29:  # ) end of the board
+            return
+        if c == 0x22:  # " top level string
+            pos = _SkipString(buf, m.end())
+            continue
+        head = headMatch(buf, start)
+        head = head.group(1) if head is not None else b""
+        if head in fast:
+            m = fast[head].match(buf, start)
+            if m is not None:
+                pos = m.end()
+                yield head, start, pos, m
+                continue
+        end = _FindClose(buf, start)
+        if head in heads:
+            yield head, start, end, None
+        pos = end
+
+
+def _GetField(node: list, name: str) -> list | None:
+    for item in node:
+        if isinstance(item, list) and len(item) != 0 and item[0] == name:
+            return item
+    return None
+
+
+class SegmentColumns:
+    def __init__(self) -> None:
+        self.sx = array("q")
+        self.sy = array("q")
+        self.ex = array("q")
+        self.ey = array("q")
+        self.width = array("q")
+        self.layer = array("q")
+        self.netcode = array("q")
+        self.uuid: List[str] = []
+
+    def Count(self):
+        return len(self.uuid)
+
+    def __len__(self):
+        return len(self.uuid)
+
+
+class ArcColumns(SegmentColumns):
+    def __init__(self) -> None:
+        super().__init__()
+        self.mx = array("q")
+        self.my = array("q")
+
+
+class ViaColumns:
+    def __init__(self) -> None:
+        self.x = array("q")
+        self.y = array("q")
+        self.size = array("q")
+        self.drill = array("q")
+        self.netcode = array("q")
+        self.uuid: List[str] = []
+
+    def Count(self):
+        return len(self.uuid)
+
+    def __len__(self):
+        return len(self.uuid)
+
+
+class PcbFile_Result:
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.size: int = 0
+        self.elapsed: float = 0.0
+        self.nets: Dict[int, str] = {}
+        self.layers: Dict[str, int] = {}
+        self.segments = SegmentColumns()
+        self.arcs = ArcColumns()
+        self.vias = ViaColumns()
+        self._netByName: Dict[str, int] = {}
+
+    def GetNetCode(self, tok: str) -> int:
+        # KiCad writes (net <code>) in tracks, newer files may reference the net by name
+        if tok.lstrip("-").isdigit():
+            return int(tok)
+        code = self._netByName.get(tok)
+        if code is None:
+            code = max(self.nets, default=0) + 1
+            self._AddNet(code, tok)
+        return code
+
+    def GetNetCodes(self, names: List[str]) -> List[int]:
+        ret: List[int] = []
+        for name in names:
+            if name not in self._netByName:
+                raise ValueError(f"net not found: {name}")
+            ret.append(self._netByName[name])
+        return ret
+
+    def GetLayer(self, name: str) -> int:
+        layer = self.layers.get(name)
+        assert layer is not None, f"Failure (unknown layer {name})"
+        return layer
+
+    def GetLayerNames(self) -> Dict[int, str]:
+        return {v: k for k, v in self.layers.items()}
+
+    def _AddNet(self, code: int, name: str):
+        self.nets[code] = name
+        self._netByName[name] = code
+
+    def _AddRecord(self, node: list):
+        head = node[0]
+        if head == "net":
+            if len(node) >= 3:
+                self._AddNet(int(node[1]), node[2])
+            elif len(node) == 2:
+                self.GetNetCode(node[1])
+            return
+        if head == "layers":
+            for item in node[1:]:
+                if isinstance(item, list) and len(item) >= 2:
+                    self.layers[item[1]] = int(item[0])
+            return
+
+        net = _GetField(node, "net")
+        netcode = self.GetNetCode(net[1]) if net is not None and len(net) >= 2 else 0
+        uuid = _GetField(node, "uuid") or _GetField(node, "tstamp")
+        uuid = uuid[1] if uuid is not None else ""
+        if head == "via":
+            at = _GetField(node, "at")
+            vias = self.vias
+            vias.x.append(ToKiUnit(at[1]))
+            vias.y.append(ToKiUnit(at[2]))
+            vias.size.append(ToKiUnit(_GetField(node, "size")[1]))
+            drill = _GetField(node, "drill")
+            vias.drill.append(ToKiUnit(drill[1]) if drill is not None else 0)
+            vias.netcode.append(netcode)
+            vias.uuid.append(uuid)
+            return
+
+        cols = self.arcs if head == "arc" else self.segments
+        start = _GetField(node, "start")
+        end = _GetField(node, "end")
+        cols.sx.append(ToKiUnit(start[1]))
+        cols.sy.append(ToKiUnit(start[2]))
+        cols.ex.append(ToKiUnit(end[1]))
+        cols.ey.append(ToKiUnit(end[2]))
+        if head == "arc":
+            mid = _GetField(node, "mid")
+            cols.mx.append(ToKiUnit(mid[1]))
+            cols.my.append(ToKiUnit(mid[2]))
+        cols.width.append(ToKiUnit(_GetField(node, "width")[1]))
+        cols.layer.append(self.GetLayer(_GetField(node, "layer")[1]))
+        cols.netcode.append(netcode)
+        cols.uuid.append(uuid)
+
+    def _AddSegmentMatch(self, m: re.Match):
+        sx, sy, ex, ey, width, layer, net, uuid = m.groups()
+        if net[0] == 0x22:  # "
+            netcode = self.GetNetCode(_Unescape(net[1:-1]))
+        else:
+            netcode = self.GetNetCode(net.decode("UTF-8"))
+        cols = self.segments
+        cols.sx.append(ToKiUnit(sx))
+        cols.sy.append(ToKiUnit(sy))
+        cols.ex.append(ToKiUnit(ex))
+        cols.ey.append(ToKiUnit(ey))
+        cols.width.append(ToKiUnit(width))
+        cols.layer.append(self.GetLayer(layer.decode("UTF-8")))
+        cols.netcode.append(netcode)
+        cols.uuid.append(uuid.decode("UTF-8"))
+
+    def ToTrackTable(self, netcodes: List[int] | None = None):
+        # Straight segments as the TrackTable consumed by ExportInfo/ExportPoint
+        from .kiLib import PY_PCB_TRACK, TrackTable
+
+        table = TrackTable([])
+        table.layerNames = self.GetLayerNames()
+        want = None if netcodes is None else set(netcodes)
+        seg = self.segments
+        for i in range(seg.Count()):
+            if want is not None and seg.netcode[i] not in want:
+                continue
+            track = PY_PCB_TRACK(None)
+            table.AppendRow(track, seg.sx[i], seg.sy[i], seg.ex[i], seg.ey[i], seg.width[i], seg.layer[i], seg.netcode[i])
+        return table
+
+    def __str__(self) -> str:
+        return (
+            f"<{self.__class__.__name__} 0x{id(self):X} "
+            + f"segment:{self.segments.Count()} arc:{self.arcs.Count()} via:{self.vias.Count()} net:{len(self.nets)}>"
+        )
+
+
+def ReadBoardFile(path: str) -> PcbFile_Result:
+    ret = PcbFile_Result(path)
+    t0 = time.perf_counter()
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            ret.size = len(buf)
+            for head, start, end, m in IterRecords(buf, fast={b"segment": _RE_SEGMENT}):
+                if m is not None:
+                    ret._AddSegmentMatch(m)
+                else:
+                    ret._AddRecord(ParseTree(buf[start:end]))
+    ret.elapsed = time.perf_counter() - t0
+    return ret
@@ -1,7 +1,9 @@
 from typing import TextIO
 
 import logging
+import os
 import sys
+import time
 
 
 class color:
@@ -122,12 +124,16 @@ class EnhancedLogger(logging.Logger):
             self.MATH = color.f_magentaL
             self.END = color.end
 
+    # 所有实例累计的 格式化+写入 耗时(秒) 由 span.RecordSpans 读取
+    elapsed: float = 0.0
+
     def __init__(self, name: str, level: int | str = 0) -> None:
         super().__init__(name, level)
 
         self.COLORS = EnhancedLogger._RE_COLOR()
 
     def _custom_log(self, level: int, msg: str):
+        t0 = time.perf_counter()
         TYPE_NUM = 2
         TYPE_HEX = 4
 
@@ -214,7 +220,7 @@ class EnhancedLogger(logging.Logger):
 
         # 只有 (0x) 开头 [0-9] [AZ] [az]
         def isHex(strin: str):
-            if not (strin[0] == "0" and strin[1] == "x"):
+            if not (len(strin) >= 2 and strin[0] == "0" and strin[1] == "x"):
                 return False
             for ch in strin[2:]:
                 i = ord(ch)
@@ -246,6 +252,14 @@ class EnhancedLogger(logging.Logger):
             color_msg += color_char(s) + " "
 
         self._log(level, color_msg, ())
+        EnhancedLogger.elapsed += time.perf_counter() - t0
+
+    @property
+    def trace(self) -> bool:
+        # 逐项日志(每个端点/线段/交点一行)的开关 即 INFO 是否启用
+        # f-string 在调用 info() 之前已经格式化 info() 内部的判断挡不住这部分开销
+        # 用法: 循环前取 trace = logger.trace 循环内 if trace: logger.info(...)
+        return self.isEnabledFor(INFO)
 
     def track(self, msg: str):
         if not self.isEnabledFor(TRACK):
@@ -352,3 +366,22 @@ def getLogger(obj: object | str | None = None) -> EnhancedLogger:
         return EnhancedLogger.manager.getLogger(obj)  # type: ignore
     obj = f"{str(type(obj))[8:-2]}:{id(obj):X}"
     return EnhancedLogger.manager.getLogger(obj)  # type: ignore
+
+
+def redirectFileHandlers(filename: str, newFilename: str):
+    # 把所有写入 filename 的文件处理器改为写入 newFilename (进程池子进程使用)
+    path = os.path.abspath(filename)
+    loggers = [_root, *(lg for lg in EnhancedLogger.manager.loggerDict.values() if isinstance(lg, EnhancedLogger))]
+    for lg in loggers:
+        for h in list(lg.handlers):
+            if not isinstance(h, logging.FileHandler) or h.baseFilename != path:
+                continue
+            lg.removeHandler(h)
+            h.close()
+            lg.addFileHandler(newFilename)
+
+
+def disableLogging(level: int = TOP):
+    # logging.disable() 只作用于标准库的 Manager 本模块的记录器使用独立的 EnhancedLogger.manager
+    EnhancedLogger.manager.disable = level
+    EnhancedLogger.manager._clear_cache()
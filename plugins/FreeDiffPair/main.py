@@ -1,9 +1,8 @@
 import os
-import wx
 import sys
 import pcbnew
 import timeit
-from .include import G_PLUGIN_LOG_FILE
+from .include import G_PLUGIN_LOG_FILE, G_PLUGIN_SETTING_WARNINGS
 from .VecSolver import PluginMain
 from .logger import getLogger
 
@@ -13,9 +12,14 @@ logger = getLogger("main")
 logger.addFileHandler(G_PLUGIN_LOG_FILE,'w')
 logger.debug(f"written file {os.path.realpath(G_PLUGIN_LOG_FILE)} ")
 logger.debug("...\n\n")
+for msg in G_PLUGIN_SETTING_WARNINGS:
+    logger.warn(msg)
 
 
 def wxPrint(msg):
+    # wx is only available inside the pcbnew GUI, the headless entry point never calls this
+    import wx
+
     wx.LogMessage(msg)
 
 
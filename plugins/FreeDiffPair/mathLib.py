@@ -1,6 +1,14 @@
 import math
 from typing import List, Tuple
 
+# KiCad 自带的 Python 不保证有 numpy 批量接口在缺失时不可用
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+G_NUMPY_ENABLE = np is not None
+
 
 class Point2D:
     def __init__(self, x: int | float, y: int | float) -> None:
@@ -40,6 +48,18 @@ G_ANGLE_RAD_TOLERANCE = 0.0000005
 G_ANGLE_DEG_FLOAT_DIGITS = 12
 
 
+# 角度容差换算为正弦平方 只在容差变化时计算一次
+_G_SIN_SQUARE_CACHE: dict = {}
+
+
+def SinSquare(rad_tolerance: int | float) -> float:
+    ret = _G_SIN_SQUARE_CACHE.get(rad_tolerance)
+    if ret is None:
+        ret = math.sin(rad_tolerance) ** 2
+        _G_SIN_SQUARE_CACHE[rad_tolerance] = ret
+    return ret
+
+
 class Rad:
     PRINT_FLOAT_DIGIT_NUM = 6
 
@@ -155,6 +175,71 @@ G_RAD_180_DEG = Rad.fromDeg(180)
 G_RAD_270_DEG = Rad.fromDeg(270)
 
 
+class Dir2D:
+    # 以 (cos, sin) 保存的方向 旋转复合用乘法 与 Rad 一样提供 cos()/sin() 可直接用于 Rotate
+    __slots__ = ("_c", "_s")
+
+    PRINT_FLOAT_DIGIT_NUM = 6
+
+    def __init__(self, cos: int | float, sin: int | float) -> None:
+        self._c = cos
+        self._s = sin
+
+    @staticmethod
+    def fromRad(v: Rad):
+        return Dir2D(v.cos(), v.sin())
+
+    @staticmethod
+    def fromDeg(v: int | float):
+        return Dir2D.fromRad(Rad.fromDeg(v))
+
+    @staticmethod
+    def fromVec(v: "Vec2D | ConstVec2D"):
+        norm = v.norm
+        if norm == 0:
+            raise ValueError("零向量角度无法确定")
+        return Dir2D(v.x / norm, v.y / norm)
+
+    def cos(self):
+        return self._c
+
+    def sin(self):
+        return self._s
+
+    def toRad(self):
+        return Rad(math.atan2(self._s, self._c))
+
+    def Inverse(self):
+        return Dir2D(self._c, -self._s)
+
+    def __mul__(self, value: "Dir2D"):
+        # 角度相加 = 复数相乘
+        return Dir2D(self._c * value._c - self._s * value._s, self._c * value._s + self._s * value._c)
+
+    def __neg__(self):
+        return self.Inverse()
+
+    def __eq__(self, value: object) -> bool:
+        return self._c == value._c and self._s == value._s  # type: ignore
+
+    def __ne__(self, value: object) -> bool:
+        return not self.__eq__(value=value)
+
+    def __str__(self) -> str:
+        FD = self.PRINT_FLOAT_DIGIT_NUM
+        return f"Dir2D(cos={self._c:+.{FD}f}, sin={self._s:+.{FD}f})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+# 常用旋转 精确值 不经过三角函数
+G_DIR_0_DEG = Dir2D(1, 0)
+G_DIR_P90DEG = Dir2D(0, 1)
+G_DIR_N90DEG = Dir2D(0, -1)
+G_DIR_180_DEG = Dir2D(-1, 0)
+
+
 class Vec3D:
     def __init__(self, x: int | float, y: int | float, z: int | float) -> None:
         self.x = x
@@ -179,10 +264,10 @@ class Vec3D:
 class Vec2D:
     PRINT_FLOAT_DIGIT_NUM = 4
 
-    def __init__(self, x: int | float, y: int | float, bias: List["Vec2D"] = []) -> None:
+    def __init__(self, x: int | float, y: int | float, bias: List["Vec2D"] | None = None) -> None:
         self.x = x
         self.y = y
-        self.biasList = bias
+        self.biasList = bias if bias is not None else []
 
     ##############################
 
@@ -244,7 +329,7 @@ class Vec2D:
     def Clone(self):
         return Vec2D(self.x, self.y)
 
-    def Rotate(self, v: Rad):
+    def Rotate(self, v: Rad | Dir2D):
         cos = v.cos()
         sin = v.sin()
         x = self.x * cos - self.y * sin
@@ -255,9 +340,7 @@ class Vec2D:
 
     @staticmethod
     def AngleEqual(a: "Vec2D", b: "Vec2D", rad_tolerance=G_ANGLE_RAD_TOLERANCE):
-        if abs(Vec2D.GetIncludedAngle(a, b).value) <= rad_tolerance:
-            return True
-        return False
+        return Vec2D.isParallel(a, b, rad_tolerance) == 1
 
     @staticmethod
     def GetIncludedAngle(a: "Vec2D", b: "Vec2D"):
@@ -265,20 +348,24 @@ class Vec2D:
 
     @staticmethod
     def isParallel(a: "Vec2D", b: "Vec2D", rad_tolerance=G_ANGLE_RAD_TOLERANCE) -> int:
-        dRad = abs(Vec2D.GetIncludedAngle(a, b).value)
-        if (dRad < rad_tolerance) or (abs(Rad.DEF_360DEG - dRad) < rad_tolerance):
-            return 1
-        if abs(Rad.DEF_180DEG - dRad) < rad_tolerance:
-            return -1
+        if a.IsZero() or b.IsZero():
+            raise ValueError("零向量角度无法确定")
+        # 夹角正弦 = 叉积 / 模长积 同向或反向由点积符号决定 全程不求角度
+        cross = a.x * b.y - a.y * b.x
+        dot = a.x * b.x + a.y * b.y
+        if cross * cross < SinSquare(rad_tolerance) * (a.x * a.x + a.y * a.y) * (b.x * b.x + b.y * b.y):
+            return 1 if dot > 0 else -1
         return 0
 
+    @staticmethod
+    def GetSinIncludedAngle(a: "Vec2D", b: "Vec2D") -> float:
+        return (a.x * b.y - a.y * b.x) / (a.norm * b.norm)
+
     @staticmethod
     def GetParallelDistance(u: "Vec2D", v: "Vec2D"):
+        # |w| * sin(aU - aW) = (w × u) / |u|
         w = v.bias - u.bias
-        aW = w.angle
-        aU = u.angle
-        a = aU - aW
-        return w.norm * a.sin()
+        return (w.x * u.y - w.y * u.x) / u.norm
 
     @staticmethod
     def GetLinearJunction(u: "Vec2D", v: "Vec2D"):
@@ -306,7 +393,7 @@ class Vec2D:
 
     @staticmethod
     def DotProduct(a, b: "Vec2D"):
-        return a.norm * b.norm * Vec2D.GetIncludedAngle(a, b).cos()
+        return a.x * b.x + a.y * b.y
 
     ##############################
 
@@ -349,8 +436,149 @@ class Vec2D:
         return not self.__eq__(value=value)
 
 
+class ConstVec2D:
+    # 不可变向量 无 __dict__ 模长首次访问时缓存
+    __slots__ = ("x", "y", "_norm")
+
+    PRINT_FLOAT_DIGIT_NUM = 4
+
+    def __init__(self, x: int | float, y: int | float) -> None:
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
+        object.__setattr__(self, "_norm", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    @staticmethod
+    def FromVec2D(v: "Vec2D | ConstVec2D"):
+        return ConstVec2D(v.x, v.y)
+
+    def toVec2D(self):
+        return Vec2D(self.x, self.y)
+
+    def toTuple(self) -> Tuple[int | float, int | float]:
+        return (self.x, self.y)
+
+    @property
+    def norm(self) -> float:
+        norm = self._norm
+        if norm is None:
+            norm = math.sqrt(self.x * self.x + self.y * self.y)
+            object.__setattr__(self, "_norm", norm)
+        return norm
+
+    def IsZero(self):
+        return self.x == 0 and self.y == 0
+
+    def SetNorm(self, s: int | float) -> "ConstVec2D":
+        ratio = s / self.norm
+        return ConstVec2D(self.x * ratio, self.y * ratio)
+
+    def Rotate(self, v: Rad | Dir2D):
+        cos = v.cos()
+        sin = v.sin()
+        return ConstVec2D(self.x * cos - self.y * sin, self.x * sin + self.y * cos)
+
+    def __str__(self) -> str:
+        FD = self.PRINT_FLOAT_DIGIT_NUM
+        return f"{self.__class__.__name__}({self.x:+}, {self.y:+}){{Size({self.norm:+.{FD}f})}}"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+    def __mul__(self, value: int | float):
+        return ConstVec2D(self.x * value, self.y * value)
+
+    def __rmul__(self, value: int | float):
+        return self.__mul__(value)
+
+    def __add__(self, value: "ConstVec2D | Vec2D") -> "ConstVec2D":
+        return ConstVec2D(self.x + value.x, self.y + value.y)
+
+    def __sub__(self, value: "ConstVec2D | Vec2D") -> "ConstVec2D":
+        return ConstVec2D(self.x - value.x, self.y - value.y)
+
+    def __neg__(self) -> "ConstVec2D":
+        return ConstVec2D(-self.x, -self.y)
+
+    def __eq__(self, value: object) -> bool:
+        return self.x == value.x and self.y == value.y  # type: ignore
+
+    def __ne__(self, value: object) -> bool:
+        return not self.__eq__(value=value)
+
+    def __hash__(self) -> int:
+        return hash((self.x, self.y))
+
+
+class Segment2D:
+    # 锚定线段 直接保存起点与方向 替代 Vec2D 的偏置列表
+    __slots__ = ("origin", "direction", "_end")
+
+    def __init__(self, origin: ConstVec2D, direction: ConstVec2D) -> None:
+        self.origin: ConstVec2D = origin
+        self.direction: ConstVec2D = direction
+        self._end: ConstVec2D | None = None
+
+    @staticmethod
+    def FromVec2D(v: Vec2D):
+        bias = v.bias
+        return Segment2D(ConstVec2D(bias.x, bias.y), ConstVec2D(v.x, v.y))
+
+    @staticmethod
+    def FromPoints(start, end):
+        return Segment2D(ConstVec2D(start.x, start.y), ConstVec2D(end.x - start.x, end.y - start.y))
+
+    @property
+    def start(self):
+        return self.origin
+
+    @property
+    def end(self):
+        if self._end is None:
+            self._end = self.origin + self.direction
+        return self._end
+
+    def Offset(self, rotate: Rad | Dir2D, distance: int | float):
+        # 方向旋转 rotate 后调整到 distance 长度 作为新起点的偏移 方向不变
+        return Segment2D(self.origin + self.direction.Rotate(rotate).SetNorm(distance), self.direction)
+
+    def OffsetNormal(self, distance: int | float):
+        # 沿法向平移 正数向 +90 度侧 负数向 -90 度侧 与 Offset(±90度, |distance|) 结果相同 只创建起点与线段
+        dx, dy = self.direction.x, self.direction.y
+        ratio = distance / self.direction.norm
+        return Segment2D(ConstVec2D(self.origin.x - dy * ratio, self.origin.y + dx * ratio), self.direction)
+
+    def toVec2D(self):
+        return Vec2D(self.direction.x, self.direction.y, [Vec2D(self.origin.x, self.origin.y)])
+
+    @staticmethod
+    def GetLinearJunction(u: "Segment2D", v: "Segment2D"):
+        # 与 Vec2D.GetLinearJunction 相同的行列式形式
+        # 终点由 起点 + 方向 直接计算 不缓存 end
+        x1, y1 = u.origin.x, u.origin.y
+        x2, y2 = x1 + u.direction.x, y1 + u.direction.y
+        x3, y3 = v.origin.x, v.origin.y
+        x4, y4 = x3 + v.direction.x, y3 + v.direction.y
+        dn = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
+        if dn == 0:
+            return None
+        a = x1 * y2 - y1 * x2
+        b = x3 * y4 - y3 * x4
+        return ConstVec2D((a * (x3 - x4) - (x1 - x2) * b) / dn, (a * (y3 - y4) - (y1 - y2) * b) / dn)
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}({self.origin.x:+}, {self.origin.y:+})->({self.end.x:+}, {self.end.y:+})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
 G_LINEAR_K_TOLERANCE = 0.000001
 G_LINEAR_B_TOLERANCE = 0.000001
+# 批量求交的平行判定 作用于两条直线单位法向量的叉积 即夹角正弦 与斜率容差 K 不是同一个量
+G_LINEAR_SIN_TOLERANCE = 0.000001
 
 
 class Linear2D:
@@ -541,10 +769,134 @@ class Linear2D:
     def GetParallelDistance(self, obj2: "Linear2D"):
         return self.ltype.GetParallelDistance(self, obj2)
 
+    # 齐次式 a*x + b*y + c = 0
+    def GetABC(self) -> Tuple[float, float, float]:
+        if isinstance(self.ltype, Linear2D.LINE_TYPE_X_ONLY):
+            return (1.0, 0.0, -float(self.value))
+        if isinstance(self.ltype, Linear2D.LINE_TYPE_Y_ONLY):
+            return (0.0, 1.0, -float(self.value))
+        return (float(self.k), -1.0, float(self.b))
+
+    @staticmethod
+    def ToABCArray(lines: List["Linear2D"]) -> "np.ndarray":
+        if np is None:
+            raise ImportError("批量直线需要 numpy")
+        return np.array([line.GetABC() for line in lines], dtype=np.float64).reshape(-1, 3)
+
+    @staticmethod
+    def GetJunctionArray(abc: "np.ndarray", pairs: "np.ndarray", sin_tolerance=G_LINEAR_SIN_TOLERANCE):
+        return LinearJunctionArray(abc, pairs, sin_tolerance)
+
     def __str__(self) -> str:
         return f"Linear2D(k={self.k:+.9f}, b={self.b:+.9f})"
 
 
+def ParallelArray(u: "np.ndarray", v: "np.ndarray", rad_tolerance=G_ANGLE_RAD_TOLERANCE) -> "np.ndarray":
+    # u(K, 2) v(K, 2) 逐行判断 1 同向平行 -1 反向平行 0 不平行 与 Vec2D.isParallel 相同
+    if np is None:
+        raise ImportError("批量判断需要 numpy")
+    u = np.asarray(u, dtype=np.float64).reshape(-1, 2)
+    v = np.asarray(v, dtype=np.float64).reshape(-1, 2)
+    cross = u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]
+    dot = DotProductArray(u, v)
+    close = cross * cross < SinSquare(rad_tolerance) * (u * u).sum(axis=1) * (v * v).sum(axis=1)
+    return np.where(close, np.where(dot > 0, 1, -1), 0).astype(np.int8)
+
+
+def ParallelDistanceArray(u: "np.ndarray", uBias: "np.ndarray", vBias: "np.ndarray") -> "np.ndarray":
+    # 起点 vBias(K, 2) 到 经过 uBias(K, 2) 方向 u(K, 2) 的直线的有符号距离 与 Vec2D.GetParallelDistance 相同
+    if np is None:
+        raise ImportError("批量判断需要 numpy")
+    u = np.asarray(u, dtype=np.float64).reshape(-1, 2)
+    w = np.asarray(vBias, dtype=np.float64).reshape(-1, 2) - np.asarray(uBias, dtype=np.float64).reshape(-1, 2)
+    return (w[:, 0] * u[:, 1] - w[:, 1] * u[:, 0]) / np.hypot(u[:, 0], u[:, 1])
+
+
+def DotProductArray(u: "np.ndarray", v: "np.ndarray") -> "np.ndarray":
+    if np is None:
+        raise ImportError("批量判断需要 numpy")
+    u = np.asarray(u, dtype=np.float64).reshape(-1, 2)
+    v = np.asarray(v, dtype=np.float64).reshape(-1, 2)
+    return u[:, 0] * v[:, 0] + u[:, 1] * v[:, 1]
+
+
+def SegmentABCArray(p1: "np.ndarray", p2: "np.ndarray") -> "np.ndarray":
+    # 经过 p1(K, 2) p2(K, 2) 的直线 齐次式(K, 3)
+    if np is None:
+        raise ImportError("批量直线需要 numpy")
+    p1 = np.asarray(p1, dtype=np.float64)
+    p2 = np.asarray(p2, dtype=np.float64)
+    abc = np.empty((len(p1), 3), dtype=np.float64)
+    abc[:, 0] = p2[:, 1] - p1[:, 1]
+    abc[:, 1] = p1[:, 0] - p2[:, 0]
+    abc[:, 2] = p2[:, 0] * p1[:, 1] - p1[:, 0] * p2[:, 1]
+    return abc
+
+
+def LinearJunctionArray(abc: "np.ndarray", pairs: "np.ndarray", sin_tolerance=G_LINEAR_SIN_TOLERANCE):
+    # abc(M, 3) 直线表 pairs(K, 2) 求交的直线序号对
+    # 返回 交点(K, 2) 和 平行掩码(K,) 平行处交点为 NaN
+    # 单位法向量叉积的绝对值(夹角正弦)不超过 sin_tolerance 视为平行
+    if np is None:
+        raise ImportError("批量直线需要 numpy")
+    abc = np.asarray(abc, dtype=np.float64)
+    pairs = np.asarray(pairs, dtype=np.intp).reshape(-1, 2)
+    l1 = abc[pairs[:, 0]]
+    l2 = abc[pairs[:, 1]]
+    a1, b1, c1 = l1[:, 0], l1[:, 1], l1[:, 2]
+    a2, b2, c2 = l2[:, 0], l2[:, 1], l2[:, 2]
+
+    # 两条齐次直线的叉积即交点 w 为法向量叉积
+    w = a1 * b2 - a2 * b1
+    scale = np.hypot(a1, b1) * np.hypot(a2, b2)
+    parallel = np.abs(w) <= sin_tolerance * scale
+
+    junction = np.full((len(w), 2), np.nan, dtype=np.float64)
+    ok = ~parallel
+    junction[ok, 0] = (b1[ok] * c2[ok] - b2[ok] * c1[ok]) / w[ok]
+    junction[ok, 1] = (a2[ok] * c1[ok] - a1[ok] * c2[ok]) / w[ok]
+    return junction, parallel
+
+
+def OffsetPolylineArray(xy: "np.ndarray", distance: int | float):
+    # 折线 (N+1, 2) 整体偏移 distance 正数向每段的 +90 度侧偏移 负数向 -90 度侧
+    # 返回 偏移线段起点(N, 2) 终点(N, 2) 相邻偏移线交点(N-1, 2) 和 平行掩码(N-1,) 平行处交点为 NaN
+    if np is None:
+        raise ImportError("批量偏移需要 numpy")
+
+    p = np.asarray(xy, dtype=np.int64).astype(np.float64)
+    d = p[1:] - p[:-1]
+    norm = np.hypot(d[:, 0], d[:, 1])
+    if np.any(norm == 0):
+        raise ValueError("零长度线段无法偏移")
+
+    # 垂向量 (x, y) 旋转 +90 度为 (-y, x) 距离符号决定旋转方向
+    perp = np.empty_like(d)
+    perp[:, 0] = -d[:, 1]
+    perp[:, 1] = d[:, 0]
+    perp *= (distance / norm)[:, None]
+
+    start = p[:-1] + perp
+    end = start + d
+
+    # 相邻两条偏移线的交点 与 Vec2D.GetLinearJunction 相同的行列式形式
+    x1, y1 = start[:-1, 0], start[:-1, 1]
+    x2, y2 = end[:-1, 0], end[:-1, 1]
+    x3, y3 = start[1:, 0], start[1:, 1]
+    x4, y4 = end[1:, 0], end[1:, 1]
+    a = x1 * y2 - y1 * x2
+    b = x3 * y4 - y3 * x4
+    dn = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
+    parallel = dn == 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        junction = np.empty((len(dn), 2), dtype=np.float64)
+        junction[:, 0] = (a * (x3 - x4) - (x1 - x2) * b) / dn
+        junction[:, 1] = (a * (y3 - y4) - (y1 - y2) * b) / dn
+    junction[parallel] = np.nan
+
+    return start, end, junction, parallel
+
+
 def _Vector2D_Test():
     def TestCumulativeRotationError():
         print("------------ TestCumulativeRotationError ------------")
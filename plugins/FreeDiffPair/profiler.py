@@ -0,0 +1,70 @@
+from functools import wraps
+from typing import Callable
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import time
+
+from .include import G_PLUGIN_LOG_FILE, G_PLUGIN_PROFILE, G_PLUGIN_PROFILE_TOP
+from .logger import getLogger
+
+logger = getLogger("profiler")
+logger.addFileHandler(G_PLUGIN_LOG_FILE)
+
+# Opt-in cProfile capture, enabled with FREEDIFFPAIR_PROFILE=1 or {"profile": true} in settings.json
+#
+# Every profiled call writes <name>-<time>-<pid>-<seq>.pstats and a .txt report of the top
+# functions (FREEDIFFPAIR_PROFILE_TOP, by cumulative and by own time) next to plugin.log.
+# When disabled, @Profiled returns the function itself. Only the calling process is
+# profiled, geometry jobs running in a process pool are not included.
+
+
+_G_PROFILE_SEQ = itertools.count()
+
+
+def GetProfilePath(name: str) -> str:
+    # Several runs in one second (cli, farm workers) still get their own files
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(os.path.dirname(os.path.abspath(G_PLUGIN_LOG_FILE)), f"{name}-{stamp}-{os.getpid()}-{next(_G_PROFILE_SEQ)}")
+
+
+def WriteProfile(profile: cProfile.Profile, path: str, top: int = G_PLUGIN_PROFILE_TOP):
+    # path without extension, returns the two files written
+    pstatsPath = path + ".pstats"
+    reportPath = path + ".txt"
+    profile.dump_stats(pstatsPath)
+
+    stream = io.StringIO()
+    stats = pstats.Stats(profile, stream=stream)
+    stats.strip_dirs()
+    stream.write(f"# top {top} by cumulative time\n")
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    stream.write(f"# top {top} by own time\n")
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(top)
+    with open(reportPath, "w", encoding="UTF-8") as f:
+        f.write(stream.getvalue())
+    return pstatsPath, reportPath
+
+
+def Profiled(name: str | None = None, enable: bool = G_PLUGIN_PROFILE):
+    def decorator(func: Callable):
+        if not enable:
+            return func
+        fileName = name if name is not None else func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(func, *args, **kwargs)
+            finally:
+                # Written for failed runs too, those are the interesting ones
+                pstatsPath, reportPath = WriteProfile(profile, GetProfilePath(fileName))
+                logger.info(f"profile {pstatsPath}")
+                logger.info(f"report  {reportPath}")
+
+        return wrapper
+
+    return decorator
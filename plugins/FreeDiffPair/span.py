@@ -0,0 +1,229 @@
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Tuple
+import os
+import time
+import tracemalloc
+
+from .logger import EnhancedLogger
+
+# Lightweight stage timing
+#
+#   with RecordSpans() as recorder:
+#       with Span("extract") as span:
+#           ...
+#           span.count += len(items)
+#       for line in recorder.Summary():
+#           logger.info(line)
+#
+# Spans record wall and CPU time, calls and an item count. Nested spans are keyed by
+# their path ("commit/create"). Outside RecordSpans, Span() and @Spanned cost one
+# global lookup and record nothing, so stage code can be instrumented unconditionally.
+#
+# RecordSpans(memory=True) adds tracemalloc accounting: every span gets its peak and
+# retained bytes (relative to its start), and the top level stages a snapshot diff
+# with the allocation sites that grew the most. Snapshots are only taken between
+# top level stages, nested spans just read the traced memory counters.
+
+
+class Span_Result:
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.calls: int = 0
+        self.count: int = 0
+        self.wall: float = 0.0
+        self.cpu: float = 0.0
+        # Bytes, only filled in memory mode
+        self.memPeak: int = 0
+        self.memRetained: int = 0
+        # (file:line, size diff, count diff) of the top level stages
+        self.memTop: List[Tuple[str, int, int]] = []
+
+    def toDict(self):
+        ret = {"calls": self.calls, "count": self.count, "wall": self.wall, "cpu": self.cpu}
+        if self.memPeak != 0 or self.memRetained != 0 or len(self.memTop) != 0:
+            ret["memPeak"] = self.memPeak
+            ret["memRetained"] = self.memRetained
+            ret["memTop"] = self.memTop
+        return ret
+
+
+# Traces of the accounting itself are not allocation sites of the plugin
+_G_MEM_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def _KiB(n: int) -> str:
+    return f"{n / 1024:.1f}KiB"
+
+
+def _MemSite(stat: tracemalloc.StatisticDiff) -> Tuple[str, int, int]:
+    frame = stat.traceback[0]
+    return f"{os.path.basename(frame.filename)}:{frame.lineno}", stat.size_diff, stat.count_diff
+
+
+class SpanRecorder:
+    def __init__(self, memory: bool = False, memoryTop: int = 5) -> None:
+        # Insertion order is the order the spans were first entered
+        self._spanDict: Dict[str, Span_Result] = {}
+        self._stack: List[str] = []
+        self.wall: float = 0.0
+        self.cpu: float = 0.0
+        # Time spent inside the logger while recording
+        self.logging: float = 0.0
+
+        self.memory: bool = memory
+        self.memoryTop: int = memoryTop
+        self.memPeak: int = 0
+        self.memRetained: int = 0
+        # [start, running peak] of every open span, tracemalloc has a single peak counter
+        self._memStack: List[List[int]] = []
+
+    def _MemEnter(self, snapshot: bool):
+        # Snapshot first, so its own memory is part of the baseline and not of the stage
+        snap = tracemalloc.take_snapshot().filter_traces(_G_MEM_FILTERS) if snapshot else None
+        current, peak = tracemalloc.get_traced_memory()
+        if len(self._memStack) != 0:
+            self._memStack[-1][1] = max(self._memStack[-1][1], peak)
+        tracemalloc.reset_peak()
+        self._memStack.append([current, current])
+        return snap
+
+    def _MemExit(self, span: Span_Result | None, snap) -> Tuple[int, int]:
+        current, peak = tracemalloc.get_traced_memory()
+        start, running = self._memStack.pop()
+        peak = max(peak, running)
+        if len(self._memStack) != 0:
+            self._memStack[-1][1] = max(self._memStack[-1][1], peak)
+        if span is not None:
+            span.memPeak = max(span.memPeak, peak - start)
+            span.memRetained += current - start
+            if snap is not None:
+                diff = tracemalloc.take_snapshot().filter_traces(_G_MEM_FILTERS).compare_to(snap, "lineno")
+                span.memTop = [_MemSite(stat) for stat in diff[: self.memoryTop] if stat.size_diff != 0]
+        return peak - start, current - start
+
+    @contextmanager
+    def Span(self, name: str, count: int = 0) -> Iterator[Span_Result]:
+        self._stack.append(name)
+        path = "/".join(self._stack)
+        span = self._spanDict.get(path)
+        if span is None:
+            span = self._spanDict[path] = Span_Result(path)
+        span.count += count
+        snap = self._MemEnter(len(self._stack) == 1) if self.memory else None
+        w0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield span
+        finally:
+            span.wall += time.perf_counter() - w0
+            span.cpu += time.process_time() - c0
+            span.calls += 1
+            if self.memory:
+                self._MemExit(span, snap)
+            self._stack.pop()
+
+    def GetSpans(self):
+        return list(self._spanDict.values())
+
+    def toDict(self):
+        ret = {
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "logging": self.logging,
+            "spans": {span.path: span.toDict() for span in self._spanDict.values()},
+        }
+        if self.memory:
+            ret["memPeak"] = self.memPeak
+            ret["memRetained"] = self.memRetained
+        return ret
+
+    def Summary(self) -> List[str]:
+        # One line per span, indented by depth, with its share of the recorded wall time
+        def pct(t: float):
+            return f"{t / self.wall * 100:5.1f}%" if self.wall > 0 else "    -"
+
+        ret = [f"span total {self.wall * 1000:.3f}ms cpu {self.cpu * 1000:.3f}ms"]
+        if self.memory:
+            ret[0] += f" mem peak {_KiB(self.memPeak)} retained {_KiB(self.memRetained)}"
+        for span in self._spanDict.values():
+            depth = span.path.count("/")
+            name = "  " * depth + span.path.rsplit("/", 1)[-1]
+            line = f"  {name:<24} {span.wall * 1000:10.3f}ms {pct(span.wall)} cpu {span.cpu * 1000:10.3f}ms x{span.calls}"
+            if span.count != 0:
+                line += f" n={span.count}"
+            if self.memory:
+                line += f" mem peak {_KiB(span.memPeak)} retained {_KiB(span.memRetained)}"
+            ret.append(line)
+            for site, size, count in span.memTop:
+                ret.append(f"  {'':<24}   {site} {size / 1024:+.1f}KiB {count:+}")
+        ret.append(f"  {'logging':<24} {self.logging * 1000:10.3f}ms {pct(self.logging)}")
+        return ret
+
+
+class _NullSpan(Span_Result):
+    # Shared sink for Span() calls outside RecordSpans
+    pass
+
+
+_G_NULL_SPAN = _NullSpan("")
+G_SPAN_RECORDER: SpanRecorder | None = None
+
+
+@contextmanager
+def _NullContext() -> Iterator[Span_Result]:
+    yield _G_NULL_SPAN
+
+
+def Span(name: str, count: int = 0):
+    if G_SPAN_RECORDER is None:
+        return _NullContext()
+    return G_SPAN_RECORDER.Span(name, count)
+
+
+def Spanned(name: str | None = None):
+    # Decorator form of Span, the span is named after the function by default
+    def decorator(func: Callable):
+        spanName = name if name is not None else func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if G_SPAN_RECORDER is None:
+                return func(*args, **kwargs)
+            with G_SPAN_RECORDER.Span(spanName):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def RecordSpans(memory: bool = False, memoryTop: int = 5) -> Iterator[SpanRecorder]:
+    # Make a new recorder current for the duration of the block, nesting restores the outer one
+    # memory: trace allocations with tracemalloc, started here if it is not already running
+    global G_SPAN_RECORDER
+    outer = G_SPAN_RECORDER
+    recorder = SpanRecorder(memory, memoryTop)
+    G_SPAN_RECORDER = recorder
+    startTrace = memory and not tracemalloc.is_tracing()
+    if startTrace:
+        tracemalloc.start()
+    if memory:
+        recorder._MemEnter(False)
+    log0 = EnhancedLogger.elapsed
+    w0, c0 = time.perf_counter(), time.process_time()
+    try:
+        yield recorder
+    finally:
+        recorder.wall = time.perf_counter() - w0
+        recorder.cpu = time.process_time() - c0
+        recorder.logging = EnhancedLogger.elapsed - log0
+        if memory:
+            recorder.memPeak, recorder.memRetained = recorder._MemExit(None, None)
+        if startTrace:
+            tracemalloc.stop()
+        G_SPAN_RECORDER = outer